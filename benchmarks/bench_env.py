@@ -0,0 +1,150 @@
+"""
+Throughput and rule-function benchmarks of the headless env, as JSON.
+
+    python benchmarks/bench_env.py [--quick] [--output results.json]
+
+Every number comes from fixed deal ids and seeds, so runs on different commits compare.
+"""
+import argparse
+import time
+import tracemalloc
+import numpy as np
+# Puts the repo on the import path
+import common
+import settings
+import spider
+import spider_env
+
+DEAL_IDS = list(range(8))
+# Actions played from the deal to reach each game depth
+DEPTHS = {"early": 0, "mid": 40, "late": 120}
+
+
+def legal_actions(mask):
+    """ Every legal action once: the legal moves, then deal and undo if they are allowed """
+    actions = [(0, source, destination) for source, destination in np.argwhere(mask[0]).tolist()]
+    if mask[1, 0, 0]:
+        actions.append((1, 0, 0))
+    if mask[2, 0, 0]:
+        actions.append((2, 0, 0))
+    return actions
+
+
+def steps_per_second(masked, steps):
+    """ Steps per second of a random policy, over all actions or only legal ones """
+    env = spider_env.SpiderEnv()
+    rng = np.random.default_rng(0)
+    steps_per_deal = steps // len(DEAL_IDS)
+    elapsed = 0
+    for deal_id in DEAL_IDS:
+        observation, info = env.reset(seed=deal_id, options={"deal_id": deal_id})
+        actions = rng.integers(env.action_space.nvec, size=(steps_per_deal, 3)).tolist()
+        start = time.perf_counter_ns()
+        for action in actions:
+            if masked:
+                legal = legal_actions(info["action_mask"])
+                if not legal:
+                    observation, info = env.reset(options={"deal_id": deal_id})
+                    continue
+                action = legal[int(rng.integers(len(legal)))]
+            observation, reward, terminated, truncated, info = env.step(action)
+            if terminated:
+                observation, info = env.reset(options={"deal_id": deal_id})
+        elapsed += time.perf_counter_ns() - start
+    return steps_per_deal * len(DEAL_IDS) / (elapsed / 1e9)
+
+
+def reset_latency(count):
+    """ Mean nanoseconds of reset() onto a numbered deal """
+    env = spider_env.SpiderEnv()
+    start = time.perf_counter_ns()
+    for index in range(count):
+        env.reset(options={"deal_id": DEAL_IDS[index % len(DEAL_IDS)]})
+    return (time.perf_counter_ns() - start) / count
+
+
+def positions(depth):
+    """ (env, snapshot) after depth random legal moves and deals from every deal """
+    rng = np.random.default_rng(depth)
+    result = []
+    for deal_id in DEAL_IDS:
+        env = spider_env.SpiderEnv()
+        observation, info = env.reset(options={"deal_id": deal_id})
+        for x in range(depth):
+            legal = [action for action in legal_actions(info["action_mask"]) if action[0] != 2]
+            if not legal:
+                break
+            observation, reward, terminated, truncated, info = env.step(legal[int(rng.integers(len(legal)))])
+        result.append((env, env.get_state()))
+    return result
+
+
+def rule_costs(depth, number):
+    """ Nanoseconds per call of the rule functions and observation building at a game depth """
+    costs = {"get_possible_moves": [], "stack_completed": [], "undo": [], "get_observations_full": [],
+             "get_observations_unchanged": []}
+    for env, state in positions(depth):
+        game = env.game
+        costs["get_possible_moves"].append(common.time_calls(game.get_possible_moves, number=number))
+        costs["stack_completed"].append(common.time_calls(
+            lambda: [game.stack_completed(pile) for pile in range(spider.PLAY_PILE_COUNT)], number=number)
+            / spider.PLAY_PILE_COUNT)
+
+        def full_observation():
+            game.changed_from[:] = [0] * settings.PILE_COUNT
+            env.get_observations()
+        costs["get_observations_full"].append(common.time_calls(full_observation, number=number))
+        costs["get_observations_unchanged"].append(common.time_calls(env.get_observations, number=number))
+
+        # Undo of every legal action of the position
+        undo_times = []
+        for action in legal_actions(env.action_masks()):
+            if action[0] == 2:
+                continue
+            env.set_state(state)
+            env.step(action)
+            start = time.perf_counter_ns()
+            game.undo()
+            undo_times.append(time.perf_counter_ns() - start)
+        if undo_times:
+            costs["undo"].append(float(np.median(undo_times)))
+        env.set_state(state)
+    return {name: float(np.mean(values)) if values else None for name, values in costs.items()}
+
+
+def memory_per_env(count):
+    """ Bytes allocated per reset SpiderEnv """
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    envs = []
+    for index in range(count):
+        env = spider_env.SpiderEnv()
+        env.reset(options={"deal_id": DEAL_IDS[index % len(DEAL_IDS)]})
+        envs.append(env)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return allocated / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="fewer repetitions, for smoke tests")
+    parser.add_argument("--output", help="JSON file to write instead of stdout")
+    args = parser.parse_args()
+    steps = 2000 if args.quick else 20000
+    number = 20 if args.quick else 200
+
+    results = {"metadata": common.metadata(), "deal_ids": DEAL_IDS}
+    results["steps_per_second"] = {
+        "random": steps_per_second(False, steps),
+        "masked_random": steps_per_second(True, steps),
+    }
+    results["reset_ns"] = reset_latency(number * 5)
+    results["rules_ns"] = {name: rule_costs(depth, number) for name, depth in DEPTHS.items()}
+    results["memory_bytes_per_env"] = memory_per_env(20 if args.quick else 200)
+    common.write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Startup cost of the headless modules, as JSON: import time, peak RSS and the first reset,
+each measured in a fresh interpreter.
+
+    python benchmarks/bench_startup.py [--quick] [--check] [--output results.json]
+
+With --check the exit status is 1 when a module goes over its budget in BUDGETS or
+imports one of WINDOW_MODULES.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import numpy as np
+# Puts the repo on the import path
+import common
+
+# Modules a rollout worker imports, with what is done right after
+TARGETS = {
+    "spider": "spider.SpiderGame().setup()",
+    "spider_env": "spider_env.SpiderEnv().reset(options={'deal_id': 0})",
+    "worker_pool": "worker_pool.spider_env.SpiderEnv().reset(options={'deal_id': 0})",
+}
+# Upper bounds per module: median import seconds and peak RSS in MiB
+BUDGETS = {
+    "spider": {"import_seconds": 0.1, "max_rss_mb": 24},
+    "spider_env": {"import_seconds": 0.5, "max_rss_mb": 64},
+    "worker_pool": {"import_seconds": 0.6, "max_rss_mb": 64},
+}
+# Modules a headless import must not load
+WINDOW_MODULES = ["arcade", "pyglet", "PIL", "table", "cards", "rasterizer"]
+
+# Run in the fresh interpreter. Prints import seconds, first action seconds, peak RSS in KiB and window modules.
+# ru_maxrss can carry over the parent's peak through exec on Linux, the process's own VmHWM can't.
+PROBE = """
+import resource, sys, time
+def max_rss():
+    try:
+        with open("/proc/self/status") as status:
+            return next(int(line.split()[1]) for line in status if line.startswith("VmHWM:"))
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+{action}
+done = time.perf_counter()
+loaded = [name for name in {window_modules!r} if name in sys.modules]
+print(imported - start, done - imported, max_rss(), ",".join(loaded))
+"""
+
+
+def probe(module):
+    """ (import seconds, first action seconds, peak RSS in MiB, window modules loaded) of one fresh import """
+    code = PROBE.format(module=module, action=TARGETS[module], window_modules=WINDOW_MODULES)
+    output = subprocess.run([sys.executable, "-c", code], cwd=common.REPO, capture_output=True, text=True,
+                            check=True, env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1")).stdout.split(" ")
+    import_seconds, action_seconds, max_rss = float(output[0]), float(output[1]), int(output[2])
+    loaded = output[3].strip()
+    return import_seconds, action_seconds, max_rss / 1024, loaded.split(",") if loaded else []
+
+
+def measure(module, runs):
+    samples = [probe(module) for x in range(runs)]
+    return {
+        "import_seconds": float(np.median([sample[0] for sample in samples])),
+        "first_action_seconds": float(np.median([sample[1] for sample in samples])),
+        "max_rss_mb": float(max(sample[2] for sample in samples)),
+        "window_modules": sorted({name for sample in samples for name in sample[3]}),
+    }
+
+
+def over_budget(module, result):
+    """ Messages for every budget a module's result breaks """
+    problems = [f"{module}: {key} {result[key]:.3f} > {limit}" for key, limit in BUDGETS[module].items()
+                if result[key] > limit]
+    if result["window_modules"]:
+        problems.append(f"{module}: imports {', '.join(result['window_modules'])}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="fewer repetitions, for smoke tests")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 when over budget")
+    parser.add_argument("--output", help="JSON file to write instead of stdout")
+    args = parser.parse_args()
+    runs = 3 if args.quick else 11
+
+    results = {"metadata": common.metadata(), "budgets": BUDGETS, "modules": {}}
+    problems = []
+    for module in TARGETS:
+        result = results["modules"][module] = measure(module, runs)
+        problems += over_budget(module, result)
+    results["within_budget"] = not problems
+    common.write_results(results, args.output)
+    if args.check and problems:
+        sys.exit("\n".join(problems))
+
+
+if __name__ == "__main__":
+    main()
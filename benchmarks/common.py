@@ -0,0 +1,54 @@
+"""
+Shared helpers of the benchmark scripts: import path, timing and JSON results.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The game modules live at the top of the repo
+if REPO not in sys.path:
+    sys.path.insert(0, REPO)
+
+
+def git_commit():
+    """ Commit of the working tree, None outside a git checkout """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata():
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def time_calls(function, repeat=5, number=100):
+    """ Best of repeat runs, in nanoseconds per call of function() """
+    best = None
+    for x in range(repeat):
+        start = time.perf_counter_ns()
+        for y in range(number):
+            function()
+        per_call = (time.perf_counter_ns() - start) / number
+        best = per_call if best is None else min(best, per_call)
+    return best
+
+
+def write_results(results, path=None):
+    """ Write results as JSON to path, or to stdout """
+    text = json.dumps(results, indent=2)
+    if path is None:
+        print(text)
+    else:
+        with open(path, "w") as f:
+            f.write(text + "\n")
@@ -1,6 +1,18 @@
 import arcade
 import settings
 
+# Textures by image file name, loaded once per process and shared by all cards
+textures = {}
+
+
+def get_texture(file_name):
+    """ The texture of an image, loaded on first use """
+    texture = textures.get(file_name)
+    if texture is None:
+        texture = textures[file_name] = arcade.load_texture(file_name)
+    return texture
+
+
 class Card(arcade.Sprite):
     """ Card sprite """
 
@@ -11,23 +23,19 @@ class Card(arcade.Sprite):
         self.suit = suit
         self.value = value
         self.value_index = settings.CARD_VALUES.index(self.value)
-        self.history={}
         # Image to use for the sprite when face up
         self.image_file_name = f":resources:images/cards/card{self.suit}{self.value}.png"
         self.is_face_up = False
-        super().__init__(settings.FACE_DOWN_IMAGE, scale, hit_box_algorithm="None")
+        super().__init__(scale=scale, hit_box_algorithm="None", texture=get_texture(settings.FACE_DOWN_IMAGE))
 
-    def add_to_history(self, move_no, pile_index=None, position=None, flipped=False):
-        self.history[move_no] = [position, pile_index, flipped]
-        
     def face_down(self):
         """ Turn card face-down """
-        self.texture = arcade.load_texture(settings.FACE_DOWN_IMAGE)
+        self.texture = get_texture(settings.FACE_DOWN_IMAGE)
         self.is_face_up = False
 
     def face_up(self):
         """ Turn card face-up """
-        self.texture = arcade.load_texture(self.image_file_name)
+        self.texture = get_texture(self.image_file_name)
         self.is_face_up = True
 
     def get_suit_encoded(self):
@@ -0,0 +1,133 @@
+"""
+Numbered, reproducible deals and a catalogue of them stored in a binary file.
+
+A deal id is the seed of a NumPy PCG64 generator that permutes the deck, so
+the same id always gives the same game. The catalogue stores the dealt decks
+with some metadata so that large sweeps don't have to shuffle at all.
+"""
+import sys
+import numpy as np
+import settings
+import spider
+
+# Deal ids are 32 bit
+DEAL_COUNT = 2 ** 32
+
+DECK = np.array(spider.DECK, dtype=np.uint8)
+# Solver node budget of estimate_difficulty, under a tenth of a second per deal
+DIFFICULTY_NODES = 200
+
+# Catalogue file: MAGIC followed by records
+MAGIC = b"SPDEALS1"
+CATALOGUE_DTYPE = np.dtype([
+    ("deal_id", "<u4"),
+    # 0 easiest to 255 hardest, see estimate_difficulty
+    ("difficulty", "u1"),
+    # Legal moves in the opening position
+    ("opening_moves", "u1"),
+    ("deck", "u1", (len(spider.DECK),)),
+])
+
+
+def deck_for_deal(deal_id):
+    """ The deck for a deal id, as bytes of card codes in dealing order """
+    return np.random.default_rng(deal_id).permutation(DECK).tobytes()
+
+
+def opening_moves(deck):
+    """ Number of legal moves in the opening position of a deck """
+    game = spider.SpiderGame()
+    game.setup(deck=deck)
+    return sum(game.move_mask)
+
+
+def estimate_difficulty(deck, max_nodes=DIFFICULTY_NODES):
+    """
+    Score how hard a deal is from a solver search of max_nodes positions. Returns 0 (easiest) to 255 (hardest).
+    Deals the search wins get 0 to 127 by the share of the budget it needed. The others get 128 to 255
+    by how far the best position found got: the face-down cards turned over, plus a stack's worth of
+    cards for every completed stack, out of the face-down cards of the opening.
+    """
+    # solver needs this module for its command line, import it only when scoring
+    import solver
+    game = spider.SpiderGame()
+    game.setup(deck=deck)
+    hidden = sum(game.face_up_from)
+    search = solver.Solver(max_nodes=max_nodes)
+    if search.solve(game) is not None:
+        return 127 * search.nodes_expanded // max_nodes
+    progress = min(1.0, (search.cards_revealed + len(settings.CARD_VALUES) * search.stacks_completed) / hidden)
+    return 255 - round(127 * progress)
+
+
+class DealCatalogue:
+    """ Deals loaded from a catalogue file, sorted by deal id """
+
+    def __init__(self, records):
+        self.records = records
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def deal_ids(self):
+        return self.records["deal_id"]
+
+    @property
+    def difficulty(self):
+        return self.records["difficulty"]
+
+    def __contains__(self, deal_id):
+        index = np.searchsorted(self.deal_ids, deal_id)
+        return index < len(self.records) and self.deal_ids[index] == deal_id
+
+    def deck(self, deal_id):
+        """ The stored deck for a deal id. Raises KeyError if the deal is not in the catalogue. """
+        index = np.searchsorted(self.deal_ids, deal_id)
+        if index == len(self.records) or self.deal_ids[index] != deal_id:
+            raise KeyError(deal_id)
+        return self.records["deck"][index].tobytes()
+
+    def with_difficulty(self, low, high):
+        """ Ids of the deals with low <= difficulty <= high """
+        difficulty = self.difficulty
+        return self.deal_ids[(difficulty >= low) & (difficulty <= high)]
+
+
+def build_catalogue(deal_ids, max_nodes=DIFFICULTY_NODES):
+    """ Catalogue records for the given deal ids, max_nodes is the solver budget of estimate_difficulty """
+    deal_ids = np.unique(np.asarray(deal_ids, dtype=np.uint32))
+    records = np.zeros(len(deal_ids), dtype=CATALOGUE_DTYPE)
+    records["deal_id"] = deal_ids
+    for record in records:
+        deck = deck_for_deal(int(record["deal_id"]))
+        record["deck"] = np.frombuffer(deck, dtype=np.uint8)
+        record["opening_moves"] = opening_moves(deck)
+        record["difficulty"] = estimate_difficulty(deck, max_nodes)
+    return records
+
+
+def save_catalogue(path, records):
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        records.tofile(f)
+
+
+def load_catalogue(path):
+    """ Memory-map a catalogue file """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a deal catalogue")
+    records = np.memmap(path, dtype=CATALOGUE_DTYPE, mode="r", offset=len(MAGIC))
+    return DealCatalogue(records)
+
+
+def main():
+    """ Write a catalogue of the first N deal ids: python deals.py catalogue.bin N """
+    path, count = sys.argv[1], int(sys.argv[2])
+    save_catalogue(path, build_catalogue(range(count)))
+    print(f"Wrote {count} deals to {path}")
+
+
+if __name__ == "__main__":
+    main()
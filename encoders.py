@@ -0,0 +1,167 @@
+"""
+Observation encoders for SpiderEnv. Each one writes into a preallocated buffer and only
+re-encodes the piles that changed since the last observation, as told by game.changed_from.
+An encoder instance keeps track of what its buffer shows, so every env needs its own.
+"""
+from gymnasium import spaces
+import numpy as np
+import settings
+import spider
+
+PLAY_PILES = range(settings.PLAY_PILE_1, settings.PLAY_PILE_10 + 1)
+STACK_LENGTH = len(settings.CARD_VALUES)
+SUIT_COUNT = len(settings.CARD_SUITS)
+# Face-down cards are only dealt at the start, 6 to a pile with the last one turned up
+MAX_HIDDEN = 5
+MAX_DEALS = 5
+
+# Cell for every card code: (encoded value, encoded suit), or -1 when face down
+CARD_OBSERVATIONS = np.array(
+    [(spider.get_value_encoded(card), spider.get_suit_encoded(card)) if spider.card_is_face_up(card) else (-1, -1)
+     for card in range(256)],
+    dtype=np.int8)
+
+
+def pile_tail(pile, length):
+    """ The last length cards of a pile as uint8, last card first """
+    return np.frombuffer(pile, dtype=np.uint8)[max(len(pile) - length, 0):][::-1]
+
+
+class GridEncoder:
+    """
+    Every pile as a row of 104 cards, (12, 104, 2) int8. Face-up cards are (encoded value, encoded suit),
+    face-down cards are -1 and empty slots 0.
+    """
+
+    def __init__(self):
+        self.observation_space = spaces.Box(low=-1, high=13, shape=(settings.PILE_COUNT, 104, 2), dtype=np.int8)
+        # Pile lengths the buffer currently shows
+        self.observed_heights = [0] * settings.PILE_COUNT
+
+    def encode(self, observations, game):
+        changed_from = game.changed_from
+        for pile_index, pile in enumerate(game.piles):
+            start = changed_from[pile_index]
+            if start == spider.NO_CHANGE:
+                continue
+            height = len(pile)
+            if start < height:
+                observations[pile_index, start:height] = CARD_OBSERVATIONS[np.frombuffer(pile, dtype=np.uint8)[start:]]
+            # Clear cells of cards that left the pile
+            if height < self.observed_heights[pile_index]:
+                observations[pile_index, height:self.observed_heights[pile_index]] = 0
+            self.observed_heights[pile_index] = height
+
+
+class TailEncoder:
+    """
+    The face-up cards at the end of each play pile, last card first and at most length of them,
+    (10, length, 2) uint8 of (encoded value, encoded suit). Slots past the face-up cards are 0.
+    """
+
+    def __init__(self, length=STACK_LENGTH):
+        self.length = length
+        self.observation_space = spaces.Box(low=0, high=STACK_LENGTH, shape=(len(PLAY_PILES), length, 2),
+                                            dtype=np.uint8)
+
+    def encode(self, observations, game):
+        changed_from = game.changed_from
+        for pile_index in PLAY_PILES:
+            if changed_from[pile_index] == spider.NO_CHANGE:
+                continue
+            row = observations[pile_index]
+            tail = pile_tail(game.piles[pile_index], self.length)
+            face_down = np.flatnonzero((tail & spider.FACE_UP) == 0)
+            count = face_down[0] if len(face_down) else len(tail)
+            row[:count] = CARD_OBSERVATIONS[tail[:count]]
+            row[count:] = 0
+
+
+class PlaneEncoder:
+    """
+    One-hot planes over the last depth cards of each play pile, last card first, (18, 10, depth) uint8.
+    Planes 0-12 are the values of face-up cards, 13-16 their suits and 17 marks face-down cards.
+    """
+    SUIT_PLANE = STACK_LENGTH
+    FACE_DOWN_PLANE = STACK_LENGTH + SUIT_COUNT
+
+    def __init__(self, depth=16):
+        self.depth = depth
+        self.observation_space = spaces.Box(low=0, high=1, shape=(self.FACE_DOWN_PLANE + 1, len(PLAY_PILES), depth),
+                                            dtype=np.uint8)
+        self.positions = np.arange(depth)
+
+    def encode(self, observations, game):
+        changed_from = game.changed_from
+        for pile_index in PLAY_PILES:
+            if changed_from[pile_index] == spider.NO_CHANGE:
+                continue
+            planes = observations[:, pile_index]
+            planes[...] = 0
+            tail = pile_tail(game.piles[pile_index], self.depth)
+            positions = self.positions[:len(tail)]
+            face_up = (tail & spider.FACE_UP) != 0
+            shown, hidden = positions[face_up], positions[~face_up]
+            planes[tail[face_up] & spider.VALUE_MASK, shown] = 1
+            planes[self.SUIT_PLANE + (tail[face_up] >> spider.SUIT_SHIFT & 0x3), shown] = 1
+            planes[self.FACE_DOWN_PLANE, hidden] = 1
+
+
+class FeatureEncoder:
+    """
+    Flat uint8 feature vector. For each play pile: face-down cards, face-up cards, encoded value and
+    suit of the last card (0 when empty) and the length of the movable run. Then the deals left in the
+    stock and the completed stacks of each suit.
+    """
+    PILE_FEATURES = 5
+    DEALS = len(PLAY_PILES) * PILE_FEATURES
+    COMPLETED = DEALS + 1
+
+    def __init__(self):
+        pile_high = [MAX_HIDDEN, 104, STACK_LENGTH, SUIT_COUNT, STACK_LENGTH]
+        high = np.array(pile_high * len(PLAY_PILES) + [MAX_DEALS] + [2] * SUIT_COUNT, dtype=np.uint8)
+        self.observation_space = spaces.Box(low=0, high=high, dtype=np.uint8)
+
+    def encode(self, observations, game):
+        changed_from = game.changed_from
+        piles = game.piles
+        for pile_index in PLAY_PILES:
+            if changed_from[pile_index] == spider.NO_CHANGE:
+                continue
+            pile = piles[pile_index]
+            features = observations[pile_index * self.PILE_FEATURES:(pile_index + 1) * self.PILE_FEATURES]
+            movable_index = game.get_movable_index(pile_index)
+            if movable_index is None:
+                features[:] = 0
+                features[0] = len(pile)
+                continue
+            hidden = game.face_up_from[pile_index]
+            features[0] = hidden
+            features[1] = len(pile) - hidden
+            features[2] = spider.get_value_encoded(pile[-1])
+            features[3] = spider.get_suit_encoded(pile[-1])
+            features[4] = len(pile) - movable_index
+        if changed_from[settings.BOTTOM_FACE_DOWN_PILE] != spider.NO_CHANGE:
+            observations[self.DEALS] = len(piles[settings.BOTTOM_FACE_DOWN_PILE]) // len(PLAY_PILES)
+        if changed_from[settings.FOUNDATION_PILE] != spider.NO_CHANGE:
+            completed = observations[self.COMPLETED:]
+            completed[:] = 0
+            foundation = piles[settings.FOUNDATION_PILE]
+            for card_index in range(0, len(foundation), STACK_LENGTH):
+                completed[spider.card_suit_index(foundation[card_index])] += 1
+
+
+# Encoders by the name SpiderEnv takes
+ENCODERS = {
+    "grid": GridEncoder,
+    "tail": TailEncoder,
+    "planes": PlaneEncoder,
+    "features": FeatureEncoder,
+}
+
+
+def make_encoder(observation):
+    """ A new encoder from its name in ENCODERS, or observation itself if it is already an encoder """
+    if isinstance(observation, str):
+        return ENCODERS[observation]()
+    return observation
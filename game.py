@@ -1,19 +1,22 @@
 """
 Solitaire clone
 """
+import logging
 import arcade
-import cards
 import settings
 import random
 import arcade.gui 
-import gymnasium as gym
+import logs
+import spider
+import table
+
+logger = logging.getLogger("spider.view")
 
 class GameView(arcade.View):
     """ Main application class. """
 
     def __init__(self):
         super().__init__()
-        self.game_over = False
         # Creating a UI MANAGER to handle the UI 
         self.uimanager = arcade.gui.UIManager() 
         self.uimanager.enable()
@@ -29,7 +32,7 @@ class GameView(arcade.View):
         
         @button.event("on_click")
         def on_click_button(event):
-            print("Showing moves")
+            logger.info("Showing moves")
             # Show possible moves
             possible_moves = self.get_possible_moves()
             screen = MovesView(self, possible_moves)
@@ -46,7 +49,8 @@ class GameView(arcade.View):
             anchor_x="center",
         )
         # Score set up
-        self.score = 500
+        self.game = spider.SpiderGame()
+        self.game.feedback_level = logging.INFO
         self.score_text = arcade.Text(
             text=f"Score: {self.score}",
             start_x=settings.TIMER_X,
@@ -55,241 +59,75 @@ class GameView(arcade.View):
             font_size=10,
             anchor_x="center",
         )
-        #  list of cards
-        self.card_list = None
         arcade.set_background_color(arcade.color.AMAZON)
         #  cards being dragged
         self.held_cards = None
         #  og location
-        self.held_cards_og_pos = None
-        #  mats
-        self.pile_mat_list = None
-        #  a list of lists for each pile
-        self.piles = None
-
-    def place_cards(self, pile_no, i):
-        for x in range(i):
-            # Pop the card off the deck we are dealing from
-            card = self.piles[settings.BOTTOM_FACE_DOWN_PILE].pop()
-            # Put in the proper pile
-            self.piles[pile_no].append(card)
-            # Move card to same position as pile we just put it in
-            if x == 0:
-                card.position = self.pile_mat_list[pile_no].position
-            else:
-                last_card = self.piles[pile_no][-2]
-                card.position = last_card.center_x, last_card.center_y - settings.CARD_VERTICAL_OFFSET
-            # Put on top in draw order
-            self.pull_to_top(card)
+        self.held_cards_original_position = None
+        #  mats and cards
+        self.table = None
 
     def setup(self):
         """ Set up the game here. Call this function to restart the game. """
-        self.game_over = False
         # Timer
         self.total_time = 0.0
-        # Score
-        self.score = 500
         #  cards being dragged
         self.held_cards = []
-        self.held_cards_og_pos = []
-
-        # ---  Create the mats the cards go on.
-
-        # Sprite list with all the mats tha cards lay on.
-        self.pile_mat_list: arcade.SpriteList = arcade.SpriteList()
-
-        # Create the mat for the bottom face down pile
-        pile = arcade.SpriteSolidColor(settings.MAT_WIDTH, settings.MAT_HEIGHT, arcade.csscolor.DARK_OLIVE_GREEN)
-        pile.position = settings.START_X, settings.BOTTOM_Y
-        self.pile_mat_list.append(pile)
-
-        # Create the 10 piles
-        for i in range(10):
-            pile = arcade.SpriteSolidColor(settings.MAT_WIDTH, settings.MAT_HEIGHT, arcade.csscolor.DARK_OLIVE_GREEN)
-            pile.position = settings.START_X + i * settings.X_SPACING, settings.TOP_Y
-            self.pile_mat_list.append(pile)
-
-        # Create foundation pile
-        pile = arcade.SpriteSolidColor(settings.MAT_WIDTH, settings.MAT_HEIGHT, arcade.csscolor.DARK_OLIVE_GREEN)
-        pile.position = settings.TIMER_X, settings.TIMER_Y/2
-        self.pile_mat_list.append(pile)
-
-        # Sprite list with all the cards, no matter what pile they are in.
-        self.card_list = arcade.SpriteList()
-
-        # Create every card
-        for x in range(2):
-            for card_suit in settings.CARD_SUITS:
-                for card_value in settings.CARD_VALUES:
-                    card = cards.Card(card_suit, card_value, settings.CARD_SCALE)
-                    card.position = settings.START_X, settings.BOTTOM_Y
-                    self.card_list.append(card)
-        
-        # Shuffle the cards
-        for pos1 in range(len(self.card_list)):
-            pos2 = random.randrange(len(self.card_list))
-            self.card_list.swap(pos1, pos2)
-
-        self.piles = [[] for x in range(settings.PILE_COUNT)]
-        # Put all the cards in the bottom face-down pile
-        for card in self.card_list:
-            self.piles[settings.BOTTOM_FACE_DOWN_PILE].append(card)
-
-        # - Pull from that pile into the middle piles, all face-down
-        # Loop for each pile
-        for pile_no in range(settings.PLAY_PILE_1, settings.PLAY_PILE_10 + 1):
-            # Deal proper number of cards for that pile
-            if pile_no < 6:
-                # Deal 6 cards
-                self.place_cards(pile_no,6)
-            else:
-                # Deal 5 cards
-                self.place_cards(pile_no,5)
-                
-        # Flip up the top cards
-        for i in range(settings.PLAY_PILE_1, settings.PLAY_PILE_10 + 1):
-            self.piles[i][-1].face_up()
+        self.held_cards_original_position = []
+
+        # Deal a shuffled game
+        self.game.setup(random)
+        #  mats and cards, kept from game to game and dealt out again by sync
+        if self.table is None:
+            self.table = table.Table()
+        self.table.release_held()
+        self.table.sync(self.game)
 
         # Load the start view
         start_screen = StartView(self)
         self.window.show_view(start_screen)          
 
-    def pull_to_top(self, card: arcade.Sprite):
-        """ Pull card to top of rendering order (last to render, looks on-top) """
-        # Remove, and append to the end
-        self.card_list.remove(card)
-        self.card_list.append(card)
+    @property
+    def score(self):
+        return self.game.score
 
     def on_draw(self):
         """ Render the screen. """
         #  Clear the screen
         self.clear()
-        #  draw mats
-        self.pile_mat_list.draw()
+        #  draw mats and cards
+        self.table.draw()
         # Draw timer
         self.timer_text.draw()
         # Draw Score
         self.score_text.draw()
-        #  draw cards
-        self.card_list.draw()
         # Drawing our ui manager 
         self.uimanager.draw() 
 
     def on_mouse_press(self, x, y, button, key_modifiers):
         """ Called when the user presses a mouse button. """
-        # Get list of cards we've clicked on
-        cards = arcade.get_sprites_at_point((x, y), self.card_list)
+        # Might be a stack of cards, get the top one
+        primary_card = self.table.top_card_at((x, y))
         
         # Have we clicked on a card?
-        if len(cards) > 0:
-            # Might be a stack of cards, get the top one
-            primary_card = cards[-1]
+        if primary_card is not None:
             # Figure out what pile the card is in
-            pile_index = self.get_pile_for_card(primary_card)
+            pile_index, card_index = self.table.locations[primary_card]
 
             # Are we clicking on the bottom deck, to deal cards on top?
             if pile_index == settings.BOTTOM_FACE_DOWN_PILE:
-                for pile_index in range(settings.PLAY_PILE_1, settings.PLAY_PILE_10 + 1):
-                    pile = self.piles[pile_index]
-                    if pile and self.piles[settings.BOTTOM_FACE_DOWN_PILE]:
-                        last_card = pile[-1]
-                        card = self.piles[settings.BOTTOM_FACE_DOWN_PILE][-1]
-                        # Flip face up
-                        card.face_up()
-                        # Move card to position
-                        card.position = last_card.center_x, last_card.center_y - settings.CARD_VERTICAL_OFFSET
-                        # Remove card from face down pile
-                        self.piles[settings.BOTTOM_FACE_DOWN_PILE].remove(card)
-                        # Add card to correct pile
-                        self.move_card_to_new_pile(card, pile_index)
-                        # Put on top draw-order wise
-                        self.pull_to_top(card)
-
-            else:
-                # All other cases, grab the face-up card we are clicking on
-                self.held_cards = [primary_card]
-                # Save the position
-                self.held_cards_original_position = [self.held_cards[0].position]
-                # Put on top in drawing order
-                self.pull_to_top(self.held_cards[0])
-
-                # Is this a stack of cards? If so, grab the other cards too
-                card_index = self.piles[pile_index].index(primary_card)
-                for i in range(card_index + 1, len(self.piles[pile_index])):
-                    card = self.piles[pile_index][i]
-                    previous_card = self.held_cards[-1]
-                    # Check if accordance with rules
-                    if previous_card.value_index - card.value_index == 1 and previous_card.suit == card.suit:
-                        self.held_cards.append(card)
-                        self.held_cards_original_position.append(card.position)
-                        self.pull_to_top(card)
-                    else:
-                        # The stack is not moveable according to rules
-                        self.held_cards = []
-                        # Pull the remaining cards on top
-                        for remaining_card in self.piles[pile_index][i:]:
-                            self.pull_to_top(remaining_card)
-                        break
-        
-    def get_last_cards(self, card_in_hand):
-        """ get a SpriteList of all last cards in a pile """
-        pile_last_card_list: arcade.SpriteList = arcade.SpriteList()
-        for pile in self.piles:
-                #  if there is a last card
-                if len(pile) > 0:
-                    #  not the same as the one in hand
-                    if pile[-1] != card_in_hand and pile[-1].is_face_up:
-                        pile_last_card_list.append(pile[-1])
-        return pile_last_card_list
-    
-    def get_playable_cards(self):
-        """ 
-        finds all the playable cards at a given state of the game. A playable card is one that can be moved.
-        If it belongs to a moveable stack then it return the top card. The whole stack will  be moved.
-        Function returns a list of all the cards.
-        """
-        playable_cards = []
-        for pile in self.piles:
-            # Not an empty pile
-            if len(pile) > 0:
-                sequence = []
-                pile_face_up = [card for card in pile if card.is_face_up]
-                for card_index in range(-1,-len(pile_face_up)-1,-1):
-                    card = pile_face_up[card_index]
-                    if len(sequence) > 0:
-                        # If sequence valid then add card
-                        if card.value_index - sequence[-1].value_index == 1 and card.suit == sequence[-1].suit:
-                            sequence.append(card)
-                        # If card can't be added then stop looking
-                        else:
-                            break
-                    if len(sequence) == 0:
-                        # first card
-                        sequence.append(card)
-                if sequence:  
-                    playable_cards.append(sequence[-1])
-        return playable_cards
-
-    def is_placable(self, pile_index):
-        #  check if there are cards in the pile
-        if self.piles[pile_index]:
-            last_card = self.piles[pile_index][-1]
-            if last_card.value_index - self.held_cards[0].value_index == 1:
-                return True
-            else:
-                return False
-        else:
-            return True
-
-    def get_closest_sprite(self, card_in_hand):
-        pile_from_mat, distance_from_mat = arcade.get_closest_sprite(card_in_hand, self.pile_mat_list)
-        last_cards = self.get_last_cards(card_in_hand)
-        if last_cards:
-            pile_from_card, distance_from_card = arcade.get_closest_sprite(card_in_hand, last_cards)   # returns the nearest card but not the corresponding pile
-            if distance_from_mat > distance_from_card:
-                #  get the pile correspdonding to that card
-                return pile_from_card, self.get_pile_for_card(pile_from_card)
-        return pile_from_mat, self.pile_mat_list.index(pile_from_mat)
+                self.game.deal()
+                self.table.sync(self.game)
+
+            # Grab the face-up card we are clicking on, if the stack above it can be moved
+            elif settings.PLAY_PILE_1 <= pile_index <= settings.PLAY_PILE_10:
+                movable_index = self.game.get_movable_index(pile_index)
+                if movable_index is not None and card_index >= movable_index:
+                    self.held_cards = self.table.pile_sprites[pile_index][card_index:]
+                    # Save the position
+                    self.held_cards_original_position = [card.position for card in self.held_cards]
+                    # Put on top in drawing order
+                    self.table.hold(self.held_cards)
 
     def on_mouse_release(self, x: float, y: float, button: int, modifiers: int):
         """ Called when the user presses a mouse button. """
@@ -297,79 +135,28 @@ class GameView(arcade.View):
         if len(self.held_cards) == 0:
             return
         
-        # Find the closest pile, in case we are in contact with more than one
-        pile, pile_index = self.get_closest_sprite(self.held_cards[0])
-        reset_position = True
+        # The pile in the nearest column, if we are in contact with its last card or its mat
+        pile_index = self.table.drop_pile(self.held_cards[0])
 
         #  the pile from where the clicked card came from
-        last_pile_index = self.get_pile_for_card(self.held_cards[0])
-
-        # See if we are in contact with the closest pile or the last card in the pile and in accordance with the rules
-        if arcade.check_for_collision(self.held_cards[0], pile) and self.is_placable(pile_index):
-
-            #  Is it the same pile we came from?
-            if pile_index == last_pile_index:
-                # If so, who cares. We'll just reset our position.
-                pass
+        last_pile_index, card_index = self.table.locations[self.held_cards[0]]
 
-            # Is it on a middle play pile?
-            elif settings.PLAY_PILE_1 <= pile_index <= settings.PLAY_PILE_10:
-                # Are there already cards there?
-                if len(self.piles[pile_index]) > 0:
-                    # Move cards to proper position
-                    top_card = self.piles[pile_index][-1]
-                    for i, dropped_card in enumerate(self.held_cards):
-                        dropped_card.position = top_card.center_x, \
-                                                top_card.center_y - settings.CARD_VERTICAL_OFFSET * (i + 1)
-                else:
-                    # Are there no cards in the middle play pile?
-                    for i, dropped_card in enumerate(self.held_cards):
-                        # Move cards to proper position
-                        dropped_card.position = pile.center_x, \
-                                                pile.center_y - settings.CARD_VERTICAL_OFFSET * i
-
-                
-                for card in self.held_cards:
-                    # Cards are in the right position, but we need to move them to the right list
-                    self.move_card_to_new_pile(card, pile_index)
-
-                # Success, don't reset position of cards
-                reset_position = False
-
-                # Flip over top card
-                if len(self.piles[last_pile_index]) > 0:
-                    top_card = self.piles[last_pile_index][-1]
-                    if not top_card.is_face_up:
-                        top_card.face_up()
-                        # Turning over a card adds 10 points
-                        self.score += 10
-
-                # Check if the move resulted in forming a stack
-                sequence = self.stack_completed(pile_index)
-                if sequence:
-                    print("Stack completed")
-                    # Remove stack from game
-                    self.remove_stack(sequence)
-                    # Add points
-                    self.score += 130
-                    # check if a card needs to be turned over
-                    if len(self.piles[pile_index]) > 0:
-                        top_card = self.piles[pile_index][-1]
-                        if not top_card.is_face_up:
-                            top_card.face_up()
-                            # Turning over a card adds 10 points
-                            self.score += 10
-                    # check if the game is over
-                    if len(self.piles[settings.FOUNDATION_PILE]) == 104:
-                        self.game_over = True
+        # The game checks the rules and leaves the piles alone if the move is invalid.
+        reset_position = True
+        if pile_index is not None:
+            reset_position = not self.game.move_card(last_pile_index, pile_index, card_index)
 
         if reset_position:
             # Where-ever we were dropped, it wasn't valid. Reset the each card's position
             # to its original spot.
-            for pile_index, card in enumerate(self.held_cards):
-                card.position = self.held_cards_original_position[pile_index]
+            for i, card in enumerate(self.held_cards):
+                card.position = self.held_cards_original_position[i]
+        else:
+            # Put every card where the game says it is
+            self.table.sync(self.game)
 
         # We are no longer holding cards
+        self.table.release_held()
         self.held_cards = []
 
     def on_mouse_motion(self, x: float, y: float, dx: float, dy: float):
@@ -380,78 +167,12 @@ class GameView(arcade.View):
             card.center_x += dx
             card.center_y += dy
 
-    def get_pile_for_card(self, card):
-        """ What pile is this card in? """
-        for index, pile in enumerate(self.piles):
-            if card in pile:
-                return index
-    
-    def remove_card_from_pile(self, card):
-        """ Remove card from whatever pile it was in. """
-        for pile in self.piles:
-            if card in pile:
-                pile.remove(card)
-                break
-
-    def move_card_to_new_pile(self, card, pile_index):
-        """ Move the card to a new pile """
-        self.remove_card_from_pile(card)
-        self.piles[pile_index].append(card)
-
     def on_key_press(self, symbol: int, modifiers: int):
         """ User presses key """
         if symbol == arcade.key.R:
             # Restart
             self.setup()
 
-    def stack_completed(self, pile_index):
-        """ 
-        Checks if the cards in a pile make up a foundation
-        Return True if a foundation exists in a pile and the index of the King
-        """
-        sequence = []
-        pile = self.piles[pile_index]
-        pile_upwards = [card for card in pile if card.is_face_up]
-        for card_index in range(-1,-len(pile_upwards)-1,-1):
-            card = pile_upwards[card_index]
-            if len(sequence) > 0:
-                # If sequence valid then add card
-                if card.value_index - sequence[-1].value_index == 1 and card.suit==sequence[-1].suit:
-                    sequence.append(card)
-                # If card can't be added then stop looking
-                else:
-                    sequence =[]
-                    break
-
-            # Check if the sequence has all the values 
-            if len(sequence) == len(settings.CARD_VALUES):
-                return sequence
-            
-            # Sequence is empty and the top card is an Ace
-            if card.value == "A" and len(sequence) == 0:
-                # Start the sequence
-                sequence.append(card)
-
-        sequence = []
-        return sequence
-    
-    def remove_stack(self, sequence):
-        # A stack has already been removed
-        if self.piles[settings.FOUNDATION_PILE]:
-            # Get the top card from previous stack
-            previous_top_card = self.piles[settings.FOUNDATION_PILE][-1]
-            # Place new stack on top the old stack with an offset 
-            for card in sequence:
-                card.position = previous_top_card.position[0], previous_top_card.position[1] - settings.CARD_VERTICAL_OFFSET
-                self.pull_to_top(card)
-                self.move_card_to_new_pile(card, settings.FOUNDATION_PILE)
-        else:
-            # Place new stack on top of the mat
-            for card in sequence:
-                card.position = self.pile_mat_list[settings.FOUNDATION_PILE].position
-                self.pull_to_top(card)
-                self.move_card_to_new_pile(card, settings.FOUNDATION_PILE)
-
     def on_update(self, delta_time):
         # Accumulate the total time
         self.total_time += delta_time
@@ -466,9 +187,9 @@ class GameView(arcade.View):
         # Update score text
         self.score_text.text = f"Score: {self.score}"
         # Check if the game is over
-        if self.game_over and len(self.piles[settings.FOUNDATION_PILE]) == 104:
-            print("Game is done")
-            self.score += 1000000/self.total_time
+        if self.game.game_over and len(self.game.piles[settings.FOUNDATION_PILE]) == 104:
+            logger.info("Game is done")
+            self.game.score += 1000000/self.total_time
             # Load the end view
             end_screen = EndView(self)
             self.window.show_view(end_screen)
@@ -479,15 +200,10 @@ class GameView(arcade.View):
         The item is a list of cards that the key card can be placed on.
         """
         possible_moves = {}
-        all_last_cards = self.get_last_cards(None)
-        all_playable_cards = self.get_playable_cards()
-        # Check each playable card against top cards in a pile
-        for playable_card in all_playable_cards:
-            possible_moves[playable_card] = []
-            for last_card in all_last_cards:
-                # Check accordance with the rules
-                if last_card.value_index - playable_card.value_index == 1:
-                    possible_moves[playable_card].append(last_card)
+        pile_sprites = self.table.pile_sprites
+        for (pile_index, card_index), destinations in self.game.get_possible_moves().items():
+            playable_card = pile_sprites[pile_index][card_index]
+            possible_moves[playable_card] = [pile_sprites[destination][-1] for destination in destinations]
         return possible_moves
     
 
@@ -524,14 +240,12 @@ class EndView(arcade.View):
         arcade.set_background_color(arcade.color.AMAZON)
 
     def on_draw(self):
-        #  draw mats
-        self.game_view.pile_mat_list.draw()
+        #  draw mats and cards
+        self.game_view.table.draw()
         # Draw timer
         self.game_view.timer_text.draw()
         # Draw Score
         self.game_view.score_text.draw()
-        #  draw cards
-        self.game_view.card_list.draw()
 
         # Calculate minutes
         minutes = int(self.game_view.total_time) // 60
@@ -554,9 +268,9 @@ class EndView(arcade.View):
     
     def on_mouse_press(self, _x, _y, _button, _modifiers):
         """ If the user presses the mouse button, re-start the game. """
-        game = GameView()
-        game.setup()
-        self.window.show_view(game)
+        # The same view deals a new game, its sprites and mats are reused
+        self.game_view.setup()
+        self.window.show_view(self.game_view)
 
 class MovesView(arcade.View):
     """View for displaying possible moves to a player"""
@@ -575,14 +289,12 @@ class MovesView(arcade.View):
 
     def on_draw(self):
         self.clear()
-        #  draw mats
-        self.game_view.pile_mat_list.draw()
+        #  draw mats and cards
+        self.game_view.table.draw()
         # Draw timer
         self.game_view.timer_text.draw()
         # Draw Score
         self.game_view.score_text.draw()
-        #  draw cards
-        self.game_view.card_list.draw()
 
         if self.item is not None and self.key is not None and self.key !=self.item:
             # Draw an orange rectangle on position to place key
@@ -643,6 +355,7 @@ class MovesView(arcade.View):
 def main():
 
     """ Main function """
+    logs.configure_console()
     window = arcade.Window(settings.SCREEN_WIDTH, settings.SCREEN_HEIGHT, settings.SCREEN_TITLE)
     start_view = GameView()
     window.show_view(start_view)
@@ -0,0 +1,93 @@
+"""
+Where the mats and cards are on the screen, in arcade coordinates (origin bottom left).
+Shared by the arcade table and the software renderer.
+"""
+import settings
+
+# Piles in drawing order, later ones on top. A play pile fanned down to the stock covers it.
+DRAW_ORDER = [settings.BOTTOM_FACE_DOWN_PILE, settings.FOUNDATION_PILE] \
+    + list(range(settings.PLAY_PILE_1, settings.PLAY_PILE_10 + 1))
+
+
+def mat_position(pile_index):
+    """ Center of the mat of a pile """
+    if pile_index == settings.BOTTOM_FACE_DOWN_PILE:
+        return settings.START_X, settings.BOTTOM_Y
+    if pile_index == settings.FOUNDATION_PILE:
+        return settings.TIMER_X, settings.TIMER_Y / 2
+    return settings.START_X + pile_index * settings.X_SPACING, settings.TOP_Y
+
+
+def card_position(pile_index, card_index):
+    """ Where a card at card_index in a pile is drawn """
+    x, y = mat_position(pile_index)
+    if pile_index == settings.BOTTOM_FACE_DOWN_PILE:
+        return x, y
+    if pile_index == settings.FOUNDATION_PILE:
+        # Each completed stack sits a bit lower than the previous one
+        card_index //= len(settings.CARD_VALUES)
+    return x, y - settings.CARD_VERTICAL_OFFSET * card_index
+
+
+def play_pile_at(x):
+    """ Play pile whose column is nearest to x """
+    column = round((x - settings.START_X) / settings.X_SPACING)
+    return min(max(column, settings.PLAY_PILE_1), settings.PLAY_PILE_10)
+
+
+def slot_at(pile_index, y, count):
+    """ Last of count fanned card slots of a pile that covers height y, None when none does """
+    top = mat_position(pile_index)[1] + settings.CARD_HEIGHT / 2
+    if not count or y > top:
+        return None
+    slot = min(int((top - y) // settings.CARD_VERTICAL_OFFSET), count - 1)
+    if y < top - settings.CARD_VERTICAL_OFFSET * slot - settings.CARD_HEIGHT:
+        return None
+    return slot
+
+
+def card_at(x, y, piles):
+    """
+    (pile index, card index) of the card drawn on top at x, y, None when there is no card there.
+    piles holds anything with the length of each pile, game piles or sprite lists.
+    """
+    # Only the first play pile overlaps another pile, it is drawn over the stock
+    for pile_index in play_pile_at(x), settings.BOTTOM_FACE_DOWN_PILE, settings.FOUNDATION_PILE:
+        if abs(x - mat_position(pile_index)[0]) > settings.CARD_WIDTH / 2:
+            continue
+        height = len(piles[pile_index])
+        if pile_index == settings.BOTTOM_FACE_DOWN_PILE:
+            # All stock cards sit on top of each other
+            slot = slot_at(pile_index, y, min(height, 1))
+            if slot is not None:
+                return pile_index, height - 1
+        elif pile_index == settings.FOUNDATION_PILE:
+            # A slot per completed stack, its last card on top
+            stack_length = len(settings.CARD_VALUES)
+            slot = slot_at(pile_index, y, -(-height // stack_length))
+            if slot is not None:
+                return pile_index, min(slot * stack_length + stack_length - 1, height - 1)
+        else:
+            slot = slot_at(pile_index, y, height)
+            if slot is not None:
+                return pile_index, slot
+    return None
+
+
+def drop_pile(x, y, piles):
+    """
+    Play pile a card centered on x, y is dropped on: the one in the nearest column, if the card touches
+    its last card, or its mat when it is empty. None when it touches neither.
+    """
+    pile_index = play_pile_at(x)
+    height = len(piles[pile_index])
+    if height:
+        target_x, target_y = card_position(pile_index, height - 1)
+        width, height = settings.CARD_WIDTH, settings.CARD_HEIGHT
+    else:
+        target_x, target_y = mat_position(pile_index)
+        width = (settings.CARD_WIDTH + settings.MAT_WIDTH) / 2
+        height = (settings.CARD_HEIGHT + settings.MAT_HEIGHT) / 2
+    if abs(x - target_x) < width and abs(y - target_y) < height:
+        return pile_index
+    return None
@@ -0,0 +1,82 @@
+"""
+Logging for the engine, envs and views. Everything logs to the "spider" logger and its
+children with the standard logging module. The "spider" logger only passes warnings by
+default and has a NullHandler of its own, so configuring the root logger doesn't make it chatty.
+
+Messages for the player, like "Invalid move", are logged at the game's feedback_level. Envs
+set it from their render mode: INFO in human mode, DEBUG otherwise. Human mode and the windowed
+entry points let INFO through, headless envs and workers stay quiet even then.
+
+An optional ring buffer keeps the most recent events in memory, at any level, and is
+dumped when a step fails.
+"""
+from collections import deque
+import logging
+import sys
+
+logger = logging.getLogger("spider")
+logger.setLevel(logging.WARNING)
+logger.addHandler(logging.NullHandler())
+
+# The installed RingBufferHandler, if any
+ring_buffer = None
+
+
+class RingBufferHandler(logging.Handler):
+    """ Keeps the last capacity log records in memory """
+
+    def __init__(self, capacity=1000, level=logging.DEBUG):
+        super().__init__(level)
+        self.records = deque(maxlen=capacity)
+        self.setFormatter(logging.Formatter("%(relativeCreated)d %(levelname)s %(name)s: %(message)s"))
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def format_records(self):
+        return "\n".join(self.format(record) for record in self.records)
+
+    def dump(self, stream=None):
+        """ Write the kept records, oldest first, to stream or stderr """
+        stream = sys.stderr if stream is None else stream
+        stream.write(self.format_records() + "\n")
+        stream.flush()
+
+
+def lower_level(level):
+    """ Let the spider logger pass messages of level and above to its handlers, it is never raised """
+    if logger.getEffectiveLevel() > level:
+        logger.setLevel(level)
+
+
+def configure_console(level=logging.INFO):
+    """ Show messages of level and above on stdout, like the prints of the windowed game did """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setLevel(level)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    lower_level(level)
+    return handler
+
+
+def enable_ring_buffer(capacity=1000, level=logging.DEBUG):
+    """ Keep the last capacity events of level and above in memory. Returns the handler. """
+    global ring_buffer
+    disable_ring_buffer()
+    ring_buffer = RingBufferHandler(capacity, level)
+    logger.addHandler(ring_buffer)
+    lower_level(level)
+    return ring_buffer
+
+
+def disable_ring_buffer():
+    global ring_buffer
+    if ring_buffer is not None:
+        logger.removeHandler(ring_buffer)
+        ring_buffer = None
+
+
+def dump_recent(stream=None):
+    """ Dump the ring buffer, if there is one """
+    if ring_buffer is not None:
+        ring_buffer.dump(stream)
@@ -0,0 +1,116 @@
+"""
+Nanosecond timers and counters for the phases of SpiderEnv.step.
+
+A StepProfiler wraps the methods of one env and its game on the instances themselves while
+it is attached, and removes the wrappers when detached. An env that is not being profiled
+runs the plain class methods, so profiling costs nothing when it is off.
+"""
+import time
+
+# Phase -> methods of the game timed under it
+GAME_PHASES = {
+    "move_card": ["move_card"],
+    "move_validation": ["validate_move"],
+    "run_lookup": ["get_movable_index"],
+    "stack_detection": ["stack_completed"],
+    "flips": ["turn_top_card"],
+    "deal": ["deal"],
+    "undo": ["undo"],
+}
+# Phase -> methods of the env timed under it
+ENV_PHASES = {
+    "step": ["step"],
+    "observations": ["update_observations"],
+    "action_masks": ["action_masks"],
+}
+COUNTERS = ["steps", "invalid_actions", "deals", "undos", "completed_stacks"]
+
+
+class StepProfiler:
+    """
+    Time spent in each phase and how often it ran. Times are inclusive: the step phase
+    contains all the others and move_card contains move_validation. run_lookup counts every
+    lookup of a pile's moveable stack, by move validation and by the legal move table alike.
+    """
+
+    def __init__(self):
+        self.times = dict.fromkeys(list(GAME_PHASES) + list(ENV_PHASES), 0)
+        self.calls = dict.fromkeys(self.times, 0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        # (object, method name) of every wrapper in place
+        self.wrapped = []
+
+    def reset(self):
+        for phase in self.times:
+            self.times[phase] = 0
+            self.calls[phase] = 0
+        for counter in self.counters:
+            self.counters[counter] = 0
+
+    def timed(self, phase, method, counts=()):
+        """ method wrapped to add its time to phase. Each of counts is called with what it returns. """
+        times, calls = self.times, self.calls
+        clock = time.perf_counter_ns
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                times[phase] += clock() - start
+                calls[phase] += 1
+            for count in counts:
+                count(result)
+            return result
+        return wrapper
+
+    def count(self, counter, when=None):
+        """ A count callback that increments counter, if when(result) is true when given """
+        counters = self.counters
+
+        def count(result):
+            if when is None or when(result):
+                counters[counter] += 1
+        return count
+
+    def wrap(self, target, name, wrapper):
+        setattr(target, name, wrapper)
+        self.wrapped.append((target, name))
+
+    def attach(self, env):
+        """ Put the wrappers on env and its game """
+        if self.wrapped:
+            return
+        game = env.game
+        invalid = self.count("invalid_actions", lambda result: result is False)
+        counts = {
+            "move_card": [invalid],
+            "deal": [self.count("deals")],
+            "undo": [invalid, self.count("undos")],
+            "step": [self.count("steps")],
+        }
+        for phases, target in [(GAME_PHASES, game), (ENV_PHASES, env)]:
+            for phase, names in phases.items():
+                for name in names:
+                    self.wrap(target, name, self.timed(phase, getattr(target, name), counts.get(name, ())))
+        remove_stack = game.remove_stack
+        completed = self.count("completed_stacks")
+
+        def counted_remove_stack(*args):
+            completed(None)
+            return remove_stack(*args)
+        self.wrap(game, "remove_stack", counted_remove_stack)
+
+    def detach(self):
+        """ Remove the wrappers, the class methods show through again """
+        for target, name in self.wrapped:
+            delattr(target, name)
+        self.wrapped = []
+
+    def get_stats(self):
+        """ {"phases": {phase: {"calls", "total_ns", "mean_ns"}}, "counters": {counter: n}} """
+        phases = {}
+        for phase, total in self.times.items():
+            calls = self.calls[phase]
+            phases[phase] = {"calls": calls, "total_ns": total, "mean_ns": total / calls if calls else 0.0}
+        return {"phases": phases, "counters": dict(self.counters)}
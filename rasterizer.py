@@ -0,0 +1,153 @@
+"""
+Software renderer for rgb_array frames. Blits cached card bitmaps at the pile offsets
+with NumPy, so no window or OpenGL context is needed.
+"""
+import importlib.util
+import math
+import os
+import numpy as np
+import layout
+import settings
+import spider
+
+# arcade.color.AMAZON and arcade.csscolor.DARK_OLIVE_GREEN
+BACKGROUND_COLOR = (59, 122, 87)
+MAT_COLOR = (85, 107, 47)
+
+# Rows of a covered card that can still be seen: the fan offset plus the rounded corners of the card above
+VISIBLE_ROWS = math.ceil(settings.CARD_VERTICAL_OFFSET) + 8
+
+# Bitmaps as (rgb, opaque mask, first and last + 1 fully opaque row), by image file name, loaded once per process
+bitmaps = {}
+
+
+def resource_path(file_name):
+    """ File path of an arcade ":resources:" image, found without importing arcade """
+    spec = importlib.util.find_spec("arcade")
+    root = os.path.join(os.path.dirname(spec.origin), "resources")
+    return os.path.join(root, file_name[len(":resources:"):])
+
+
+def load_bitmap(file_name):
+    """ An image scaled to the card size, see bitmaps """
+    bitmap = bitmaps.get(file_name)
+    if bitmap is None:
+        from PIL import Image
+        image = Image.open(resource_path(file_name)).convert("RGBA")
+        size = round(image.width * settings.CARD_SCALE), round(image.height * settings.CARD_SCALE)
+        pixels = np.asarray(image.resize(size, Image.LANCZOS))
+        bitmap = bitmaps[file_name] = make_bitmap(pixels[..., :3], pixels[..., 3] >= 128)
+    return bitmap
+
+
+def make_bitmap(rgb, mask):
+    """
+    Bitmap from colors and an opaque mask. Only the rows with transparent pixels, the rounded corners
+    of a card, need a masked copy, the fully opaque rows between them are copied as a block.
+    """
+    opaque_rows = np.flatnonzero(mask.all(axis=1))
+    first, last = (opaque_rows[0], opaque_rows[-1] + 1) if len(opaque_rows) else (0, 0)
+    mask = np.repeat(mask[:, :, None], 3, axis=2)
+    return np.ascontiguousarray(rgb), mask, int(first), int(last)
+
+
+def card_image(card):
+    """ Image file of a card code, the card back when it is face down """
+    if spider.card_is_face_up(card):
+        return f":resources:images/cards/card{spider.card_suit(card)}{spider.card_value(card)}.png"
+    return settings.FACE_DOWN_IMAGE
+
+
+class Rasterizer:
+    """
+    Draws the table of a SpiderGame into a NumPy frame, like table.Table does on screen.
+    Every play pile has its own column band, the stock shares the band of the first pile.
+    Only bands whose piles changed since the last frame are drawn again.
+    """
+
+    def __init__(self, width=settings.SCREEN_WIDTH, height=settings.SCREEN_HEIGHT):
+        self.width = width
+        self.height = height
+        # The table without cards
+        self.background = np.empty((height, width, 3), dtype=np.uint8)
+        self.background[...] = BACKGROUND_COLOR
+        for pile_index in range(settings.PILE_COUNT):
+            x, y = layout.mat_position(pile_index)
+            rows, columns = self.clip(x, y, settings.MAT_WIDTH, settings.MAT_HEIGHT)[:2]
+            self.background[rows, columns] = MAT_COLOR
+        self.frame = self.background.copy()
+        # Bitmap of every card code, filled in on first use
+        self.card_bitmaps = [None] * 128
+        # (frame columns, piles drawn in them) in drawing order
+        self.bands = []
+        for pile_indices in [(settings.BOTTOM_FACE_DOWN_PILE, settings.PLAY_PILE_1)] \
+                + [(pile_index,) for pile_index in range(settings.PLAY_PILE_2, settings.PLAY_PILE_10 + 1)] \
+                + [(settings.FOUNDATION_PILE,)]:
+            x, y = layout.mat_position(pile_indices[-1])
+            self.bands.append((self.clip(x, y, settings.MAT_WIDTH, settings.MAT_HEIGHT)[1], pile_indices))
+        # Cards of the piles of each band in the frame
+        self.drawn_cards = [None] * len(self.bands)
+
+    def clip(self, x, y, width, height):
+        """
+        Frame rows and columns covered by a width x height box centered on arcade coordinates x, y,
+        and the matching rows and columns of the box
+        """
+        left = int(round(x - width / 2))
+        top = self.height - int(round(y + height / 2))
+        x0, y0 = max(left, 0), max(top, 0)
+        x1, y1 = min(left + width, self.width), min(top + height, self.height)
+        return slice(y0, max(y1, y0)), slice(x0, max(x1, x0)), slice(y0 - top, max(y1, y0) - top), \
+            slice(x0 - left, max(x1, x0) - left)
+
+    def blit(self, card, x, y, covered=False):
+        """ Draw a card centered on x, y. Only the visible top strip of a covered card is drawn. """
+        bitmap = self.card_bitmaps[card]
+        if bitmap is None:
+            bitmap = self.card_bitmaps[card] = load_bitmap(card_image(card))
+        rgb, mask, first_opaque, last_opaque = bitmap
+        height, width = rgb.shape[:2]
+        rows, columns, bitmap_rows, bitmap_columns = self.clip(x, y, width, height)
+        if covered:
+            rows = slice(rows.start, min(rows.stop, rows.start + VISIBLE_ROWS))
+            bitmap_rows = slice(bitmap_rows.start, bitmap_rows.start + rows.stop - rows.start)
+        target = self.frame[rows, columns]
+        source = rgb[bitmap_rows, bitmap_columns]
+        mask = mask[bitmap_rows, bitmap_columns]
+        # Opaque rows of the clipped bitmap
+        row_count = len(source)
+        first = min(max(first_opaque - bitmap_rows.start, 0), row_count)
+        last = min(max(last_opaque - bitmap_rows.start, first), row_count)
+        target[first:last] = source[first:last]
+        np.copyto(target[:first], source[:first], where=mask[:first])
+        np.copyto(target[last:], source[last:], where=mask[last:])
+
+    def draw_pile(self, pile_index, pile):
+        if not pile:
+            return
+        if pile_index == settings.BOTTOM_FACE_DOWN_PILE:
+            # All stock cards sit on top of each other, only the last one shows
+            self.blit(pile[-1], *layout.card_position(pile_index, len(pile) - 1))
+        elif pile_index == settings.FOUNDATION_PILE:
+            # Only the last card of each completed stack shows
+            stack_length = len(settings.CARD_VALUES)
+            for card_index in range(stack_length - 1, len(pile), stack_length):
+                self.blit(pile[card_index], *layout.card_position(pile_index, card_index))
+        else:
+            last_index = len(pile) - 1
+            for card_index, card in enumerate(pile):
+                x, y = layout.card_position(pile_index, card_index)
+                self.blit(card, x, y, covered=card_index < last_index)
+
+    def render(self, game):
+        """ The table as a (height, width, 3) uint8 frame. Timer and score are not drawn. """
+        piles = game.piles
+        for band_index, (columns, pile_indices) in enumerate(self.bands):
+            cards = [piles[pile_index].tobytes() for pile_index in pile_indices]
+            if cards == self.drawn_cards[band_index]:
+                continue
+            self.frame[:, columns] = self.background[:, columns]
+            for pile_index in pile_indices:
+                self.draw_pile(pile_index, piles[pile_index])
+            self.drawn_cards[band_index] = cards
+        return self.frame.copy()
@@ -0,0 +1,161 @@
+"""
+Episodes recorded as deal id plus actions plus rewards, in append-only binary files.
+
+A recording is two files: path holds fixed-size step records of every episode one after
+the other, path + ".index" one fixed-size record per episode with its deal id and where
+its steps start. Both are MAGIC followed by records and can be memory-mapped. Any
+position of an episode is rebuilt by playing its actions again from the deal, except
+in episodes flagged FROM_STATE, which started from a position restored with set_state.
+"""
+import os
+import struct
+import numpy as np
+import deals
+import spider
+
+STEPS_MAGIC = b"SPSTEPS1"
+INDEX_MAGIC = b"SPEPIDX2"
+STEP_DTYPE = np.dtype([
+    # action type, source, destination
+    ("action", "u1", (3,)),
+    ("terminated", "?"),
+    ("reward", "<f4"),
+])
+INDEX_DTYPE = np.dtype([
+    # -1 for the unshuffled deck
+    ("deal_id", "<i8"),
+    # First step record of the episode
+    ("start", "<u8"),
+    ("length", "<u4"),
+    ("total_reward", "<f4"),
+    ("flags", "<u4"),
+])
+STEP_RECORD = struct.Struct("<3B?f")
+INDEX_RECORD = struct.Struct("<qQIfI")
+NO_DEAL = -1
+# Index flag of an episode that started from a set_state position, not from its deal
+FROM_STATE = 1
+
+
+def _open_append(path, magic):
+    """ Open a recording file for appending, writing its magic if it is new """
+    f = open(path, "ab")
+    if f.tell() == 0:
+        f.write(magic)
+    else:
+        with open(path, "rb") as check:
+            if check.read(len(magic)) != magic:
+                f.close()
+                raise ValueError(f"{path} is not an episode recording")
+    return f
+
+
+class EpisodeRecorder:
+    """ Appends episodes to a recording. SpiderEnv(record_path=...) drives one. """
+
+    def __init__(self, path):
+        self.path = path
+        self.steps_file = _open_append(path, STEPS_MAGIC)
+        self.index_file = _open_append(path + ".index", INDEX_MAGIC)
+        # Step records in the file so far
+        self.step_count = (self.steps_file.tell() - len(STEPS_MAGIC)) // STEP_DTYPE.itemsize
+        # Episode being recorded as (deal id, first step, length, total reward, flags), None between episodes
+        self.episode = None
+
+    def begin(self, deal_id, flags=0):
+        """ Start an episode, ending the one before if it is still open """
+        self.end()
+        self.episode = [NO_DEAL if deal_id is None else deal_id, self.step_count, 0, 0.0, flags]
+
+    def check_open(self):
+        """ Raise if no episode is open, before a step or after a terminated one """
+        if self.episode is None:
+            raise RuntimeError("No episode is being recorded, call reset() before step()")
+
+    def record(self, action, reward, terminated):
+        self.check_open()
+        action_type, source, destination = action
+        self.steps_file.write(STEP_RECORD.pack(action_type, source, destination, terminated, reward))
+        self.step_count += 1
+        self.episode[2] += 1
+        self.episode[3] += reward
+        if terminated:
+            self.end()
+
+    def end(self):
+        """
+        Write the index record of the open episode. A FROM_STATE episode without steps is dropped,
+        so a search restoring positions it never steps from leaves nothing behind.
+        """
+        if self.episode is not None:
+            if self.episode[2] or not self.episode[4] & FROM_STATE:
+                self.index_file.write(INDEX_RECORD.pack(*self.episode))
+            self.episode = None
+
+    def flush(self):
+        self.steps_file.flush()
+        self.index_file.flush()
+
+    def close(self):
+        self.end()
+        self.steps_file.close()
+        self.index_file.close()
+
+
+class EpisodeLog:
+    """ A memory-mapped recording """
+
+    def __init__(self, steps, index):
+        self.steps = steps
+        self.index = index
+
+    def __len__(self):
+        return len(self.index)
+
+    def is_replayable(self, episode):
+        """ Can the positions of an episode be rebuilt from its deal? """
+        return not int(self.index["flags"][episode]) & FROM_STATE
+
+    def deal_id(self, episode):
+        """ Deal of an episode, None for the unshuffled deck """
+        deal_id = int(self.index["deal_id"][episode])
+        return None if deal_id == NO_DEAL else deal_id
+
+    def episode_steps(self, episode):
+        """ Step records of an episode """
+        start = int(self.index["start"][episode])
+        return self.steps[start:start + int(self.index["length"][episode])]
+
+    def replay(self, episode, step=None):
+        """
+        A SpiderGame in the position after the first step actions of an episode, all of them by default,
+        played again from its deal. Raises ValueError for a FROM_STATE episode.
+        """
+        if not self.is_replayable(episode):
+            raise ValueError(f"Episode {episode} started from a set_state position, not from its deal")
+        deal_id = self.deal_id(episode)
+        game = spider.SpiderGame()
+        game.setup(deck=None if deal_id is None else deals.deck_for_deal(deal_id))
+        for action_type, source, destination in self.episode_steps(episode)["action"][:step].tolist():
+            if action_type == 0:
+                game.move_card(source, destination)
+            elif action_type == 1:
+                game.deal()
+            elif action_type == 2:
+                game.undo()
+        return game
+
+
+def load_episodes(path):
+    """ Memory-map a recording """
+    arrays = []
+    for file_path, magic, dtype in [(path, STEPS_MAGIC, STEP_DTYPE), (path + ".index", INDEX_MAGIC, INDEX_DTYPE)]:
+        with open(file_path, "rb") as f:
+            if f.read(len(magic)) != magic:
+                raise ValueError(f"{file_path} is not an episode recording")
+        if os.path.getsize(file_path) == len(magic):
+            # np.memmap can't map an empty range
+            arrays.append(np.zeros(0, dtype=dtype))
+        else:
+            arrays.append(np.memmap(file_path, dtype=dtype, mode="r", offset=len(magic)))
+    return EpisodeLog(*arrays)
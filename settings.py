@@ -70,3 +70,6 @@ PLAY_PILE_9 = 8
 PLAY_PILE_10 = 9
 BOTTOM_FACE_DOWN_PILE = 10
 FOUNDATION_PILE = 11
+
+# How many moves and deals can be undone
+UNDO_LIMIT = 1000
@@ -0,0 +1,284 @@
+"""
+Best-first and beam search for Spider solutions over the rules engine
+"""
+import heapq
+import itertools
+import sys
+import time
+import deals
+import settings
+import spider
+
+MOVE, DEAL = 0, 1
+
+# Heuristic weights, lower scores are better
+FACE_DOWN_COST = 5
+BREAK_COST = 1
+STOCK_COST = 2
+COMPLETED_STACK_BONUS = 50
+# Default node budget, about a quarter of a second per deal: over ten thousand deals per hour per core.
+# It rarely finds a win, deals are mostly told apart by the progress stats of the search, see Solver.
+MAX_NODES = 1000
+# Most undos plus replayed actions to walk between positions, further ones are restored from a snapshot
+WALK_LIMIT = 3
+
+
+def evaluate(game):
+    """
+    Heuristic cost of a position. Hidden cards, broken runs and the stock cost, completed stacks pay.
+    Read off the run lengths the game keeps, no card is looked at.
+    """
+    cost = 0
+    piles, runs, face_up_from = game.piles, game.runs, game.face_up_from
+    for pile_index in range(settings.PLAY_PILE_1, settings.PLAY_PILE_10 + 1):
+        hidden = face_up_from[pile_index]
+        cost += FACE_DOWN_COST * hidden
+        if hidden < len(piles[pile_index]):
+            # Every face-up card but the first that does not continue a run starts a new one
+            cost += BREAK_COST * (runs[pile_index].count(1) - 1)
+    cost += STOCK_COST * len(game.piles[settings.BOTTOM_FACE_DOWN_PILE]) // spider.PLAY_PILE_COUNT
+    cost -= COMPLETED_STACK_BONUS * len(game.piles[settings.FOUNDATION_PILE]) // len(settings.CARD_VALUES)
+    return cost
+
+
+def is_reversible(game, source_pile_index, destination_pile_index):
+    """
+    Moves that gain nothing and can be made back: a run already on a face-up card one higher
+    going to another card one higher of a different suit, or a whole pile going to an empty pile.
+    """
+    source_pile = game.piles[source_pile_index]
+    destination_pile = game.piles[destination_pile_index]
+    movable_index = game.get_movable_index(source_pile_index)
+    if movable_index == 0:
+        return not destination_pile
+    parent = source_pile[movable_index - 1]
+    if not parent & spider.FACE_UP or (parent & spider.VALUE_MASK) - (source_pile[movable_index] & spider.VALUE_MASK) != 1:
+        return False
+    # Onto the same suit builds a longer run, anything else is a sideways move
+    return not destination_pile or destination_pile[-1] - source_pile[movable_index] != 1
+
+
+def legal_actions(game):
+    """ Moves from the legal move table that are worth searching, and dealing """
+    actions = []
+    move_mask = game.move_mask
+    for index in range(len(move_mask)):
+        if move_mask[index]:
+            source, destination = divmod(index, spider.PLAY_PILE_COUNT)
+            if not is_reversible(game, source, destination):
+                actions.append((MOVE, source, destination))
+    if game.can_deal():
+        actions.append((DEAL, 0, 0))
+    return actions
+
+
+def apply_action(game, action):
+    action_type, source, destination = action
+    if action_type == MOVE:
+        game.move_card(source, destination)
+    else:
+        game.deal()
+
+
+class Solver:
+    """
+    Searches for a winning sequence of actions. Best-first by default, or beam search
+    keeping beam_width positions per depth. Positions already seen, by Zobrist hash, are skipped.
+    The search stops after max_nodes expanded positions or max_seconds.
+
+    Positions in the frontier are (parent key, action) with the cost of the child, so a child is only
+    made when it is expanded. The search walks one game from position to position: a child of the
+    position the game is in is one action away, nearby positions are reached by undoing and replaying
+    a few actions, only the others are restored from a snapshot.
+
+    Besides the plan, a search records how far it got: the lowest evaluate() cost it saw, the
+    actions to that position and the stacks completed and cards turned over there. With a small
+    budget most searches end without a win, these stats are what tells deals apart then.
+    """
+
+    def __init__(self, max_nodes=MAX_NODES, max_seconds=None, beam_width=None):
+        self.max_nodes = max_nodes
+        self.max_seconds = max_seconds
+        self.beam_width = beam_width
+        # Stats of the last search
+        self.nodes_expanded = 0
+        self.restores = 0
+        self.elapsed = 0.0
+        # Best position of the last search, the winning one if it found a win
+        self.best_cost = None
+        self.best_plan = []
+        self.stacks_completed = 0
+        self.cards_revealed = 0
+        # Key of the best position, during a search
+        self.best_key = None
+        # key -> snapshot of every expanded position, during a search
+        self.states = {}
+        # key -> (parent key, action), None for the root, during a search
+        self.parents = {}
+
+    def out_of_budget(self, start):
+        if self.nodes_expanded >= self.max_nodes:
+            return True
+        return self.max_seconds is not None and time.perf_counter() - start >= self.max_seconds
+
+    def expand(self, game):
+        """ Children of the position game is in as (action, key, cost, won). game is left in that position. """
+        self.nodes_expanded += 1
+        self.states[game.state_hash] = game.get_state()
+        children = []
+        for action in legal_actions(game):
+            apply_action(game, action)
+            children.append((action, game.state_hash, evaluate(game), game.game_over))
+            game.undo()
+        return children
+
+    def reach(self, game, parent_key, action):
+        """ Put game in the position action leads to from an expanded position """
+        if game.state_hash != parent_key and not self.walk(game, parent_key):
+            self.restores += 1
+            game.set_state(self.states[parent_key])
+        apply_action(game, action)
+
+    def walk(self, game, key):
+        """
+        Move game to a searched position through a common ancestor, by undoing and replaying
+        at most WALK_LIMIT actions. Returns False, leaving game alone, if it is further away.
+        """
+        parents = self.parents
+        # Ancestors of the position game is in, by how many undos they are away
+        undos = {}
+        current = game.state_hash
+        for steps in range(min(len(game.journal), WALK_LIMIT) + 1):
+            undos[current] = steps
+            if parents[current] is None:
+                break
+            current = parents[current][0]
+        path = []
+        current = key
+        while current not in undos:
+            if len(path) == WALK_LIMIT or parents[current] is None:
+                return False
+            current, action = parents[current]
+            path.append(action)
+        if undos[current] + len(path) > WALK_LIMIT:
+            return False
+        for x in range(undos[current]):
+            game.undo()
+        for action in reversed(path):
+            apply_action(game, action)
+        return True
+
+    def solve(self, game):
+        """
+        Returns a list of actions (action type, source, destination) that wins from the
+        position of game, or None if no solution was found within the budget.
+        game itself is not changed.
+        """
+        start = time.perf_counter()
+        self.nodes_expanded = 0
+        self.restores = 0
+        root = game.get_state()
+        work = spider.SpiderGame()
+        work.set_state(root)
+        self.best_cost = evaluate(work)
+        self.best_key = work.state_hash
+        if self.beam_width is None:
+            plan = self.best_first(work, start)
+        else:
+            plan = self.beam(work, start)
+        self.record_best(root)
+        self.elapsed = time.perf_counter() - start
+        # Snapshots are only needed during a search
+        self.states = {}
+        self.parents = {}
+        return plan
+
+    def record_best(self, root):
+        """ Replay the actions to the best position from root and record its stats """
+        self.best_plan = self.plan_to(self.parents, self.best_key)
+        game = spider.SpiderGame()
+        game.set_state(root)
+        hidden = sum(game.face_up_from)
+        stacks = len(game.piles[settings.FOUNDATION_PILE])
+        for action in self.best_plan:
+            apply_action(game, action)
+        self.cards_revealed = hidden - sum(game.face_up_from)
+        self.stacks_completed = (len(game.piles[settings.FOUNDATION_PILE]) - stacks) // len(settings.CARD_VALUES)
+
+    @staticmethod
+    def plan_to(parents, key):
+        plan = []
+        while parents[key] is not None:
+            key, action = parents[key]
+            plan.append(action)
+        plan.reverse()
+        return plan
+
+    def best_first(self, game, start):
+        parents = self.parents = {game.state_hash: None}
+        counter = itertools.count()
+        # (cost, order, key, parent key, action), the root has no parent to reach it from.
+        # Ties go to the newest position, most often a child of the one the game is in.
+        frontier = [(evaluate(game), next(counter), game.state_hash, None, None)]
+        while frontier and not self.out_of_budget(start):
+            cost, order, key, parent_key, action = heapq.heappop(frontier)
+            if parent_key is not None:
+                self.reach(game, parent_key, action)
+            for action, child_key, child_cost, won in self.expand(game):
+                if child_key in parents:
+                    continue
+                parents[child_key] = (key, action)
+                if won:
+                    self.best_cost, self.best_key = child_cost, child_key
+                    return self.plan_to(parents, child_key)
+                if child_cost < self.best_cost:
+                    self.best_cost, self.best_key = child_cost, child_key
+                heapq.heappush(frontier, (child_cost, -next(counter), child_key, key, action))
+        return None
+
+    def beam(self, game, start):
+        parents = self.parents = {game.state_hash: None}
+        # (cost, key, parent key, action) as in best_first
+        frontier = [(evaluate(game), game.state_hash, None, None)]
+        while frontier and not self.out_of_budget(start):
+            children = []
+            for cost, key, parent_key, action in frontier:
+                if self.out_of_budget(start):
+                    break
+                if parent_key is not None:
+                    self.reach(game, parent_key, action)
+                for action, child_key, child_cost, won in self.expand(game):
+                    if child_key in parents:
+                        continue
+                    parents[child_key] = (key, action)
+                    if won:
+                        self.best_cost, self.best_key = child_cost, child_key
+                        return self.plan_to(parents, child_key)
+                    if child_cost < self.best_cost:
+                        self.best_cost, self.best_key = child_cost, child_key
+                    children.append((child_cost, child_key, key, action))
+            children.sort(key=lambda child: child[0])
+            frontier = children[:self.beam_width]
+        return None
+
+
+def main():
+    """ Solve a deal: python solver.py DEAL_ID [MAX_NODES] """
+    deal_id = int(sys.argv[1])
+    max_nodes = int(sys.argv[2]) if len(sys.argv) > 2 else MAX_NODES
+    game = spider.SpiderGame()
+    game.setup(deck=deals.deck_for_deal(deal_id))
+    solver = Solver(max_nodes=max_nodes)
+    plan = solver.solve(game)
+    if plan is None:
+        print(f"Deal {deal_id}: no solution found ({solver.nodes_expanded} nodes, {solver.elapsed:.2f}s), "
+              f"best position after {len(solver.best_plan)} actions: {solver.stacks_completed} stacks completed, "
+              f"{solver.cards_revealed} cards turned over")
+    else:
+        print(f"Deal {deal_id}: solved in {len(plan)} actions ({solver.nodes_expanded} nodes, {solver.elapsed:.2f}s)")
+        for action in plan:
+            print(action)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,504 @@
+"""
+Spider rules engine. Pure Python, no arcade or OpenGL needed.
+
+Cards are small ints: bits 0-3 hold the value index, bits 4-5 the suit index
+and bit 6 is set when the card is face up. Piles are byte arrays of cards.
+"""
+from array import array
+from collections import deque
+import logging
+import random
+import struct
+import settings
+
+logger = logging.getLogger("spider")
+
+VALUE_MASK = 0x0F
+SUIT_SHIFT = 4
+FACE_UP = 0x40
+
+
+def encode_card(suit_index, value_index, face_up=False):
+    """ Pack a card into an int """
+    return value_index | suit_index << SUIT_SHIFT | (FACE_UP if face_up else 0)
+
+
+def card_value_index(card):
+    return card & VALUE_MASK
+
+
+def card_suit_index(card):
+    return card >> SUIT_SHIFT & 0x3
+
+
+def card_is_face_up(card):
+    return card & FACE_UP != 0
+
+
+def card_suit(card):
+    return settings.CARD_SUITS[card >> SUIT_SHIFT & 0x3]
+
+
+def card_value(card):
+    return settings.CARD_VALUES[card & VALUE_MASK]
+
+
+def get_suit_encoded(card):
+    return (card >> SUIT_SHIFT & 0x3) + 1
+
+
+def get_value_encoded(card):
+    return (card & VALUE_MASK) + 1
+
+
+# Both decks, unshuffled and face down
+DECK = [encode_card(suit_index, value_index)
+        for x in range(2)
+        for suit_index in range(len(settings.CARD_SUITS))
+        for value_index in range(len(settings.CARD_VALUES))]
+
+PLAY_PILE_COUNT = settings.PLAY_PILE_10 + 1
+NO_CHANGE = 104
+
+# Zobrist keys, one random 64 bit number per (pile, card index, card code).
+# The hash of a position is the xor of the keys of all its cards.
+ZOBRIST_CARDS = 128
+ZOBRIST_SEED = 20240101
+ZOBRIST = array("Q", random.Random(ZOBRIST_SEED).randbytes(settings.PILE_COUNT * 104 * ZOBRIST_CARDS * 8))
+
+
+def zobrist_key(pile_index, card_index, card):
+    return ZOBRIST[(pile_index * 104 + card_index) * ZOBRIST_CARDS + card]
+
+
+# State snapshot header: score, number of moves made and the length of every pile. The cards follow.
+STATE_HEADER = struct.Struct(f"<dI{settings.PILE_COUNT}B")
+
+
+class SpiderGame:
+    """
+    Game state for Spider: piles, face-up flags, scoring and win detection.
+    Views read the piles and call the move/deal/undo methods.
+    """
+
+    def __init__(self):
+        self.game_over = False
+        self.score = 500
+        # Reward collected by the current action
+        self.reward = 0
+        # Journal of the last moves and deals for undo. Each entry is (operations, score change, reward change).
+        self.journal = deque(maxlen=settings.UNDO_LIMIT)
+        # Operations of the action in progress
+        self.operations = []
+        self.no_of_moves_made = 0
+        #  a byte array for each pile
+        self.piles = None
+        # Legal moves, indexed by source * PLAY_PILE_COUNT + destination. Kept up to date as piles change.
+        self.move_mask = bytearray(PLAY_PILE_COUNT * PLAY_PILE_COUNT)
+        # Value index of the last card and of the playable card of each play pile, -1 if empty
+        self.top_values = [-1] * PLAY_PILE_COUNT
+        self.movable_values = [-1] * PLAY_PILE_COUNT
+        # For each play pile and card, the length of the same-suit descending run ending at that card,
+        # 0 for a face-down card. Parallel to the piles and kept up to date as they change.
+        self.runs = [array("B") for x in range(PLAY_PILE_COUNT)]
+        # Index of the first face-up card of each play pile, its length if there is none
+        self.face_up_from = [0] * PLAY_PILE_COUNT
+        # Lowest card index of each pile that changed since a view last caught up, NO_CHANGE if none
+        self.changed_from = [0] * settings.PILE_COUNT
+        # Zobrist hash of the piles, see ZOBRIST
+        self.state_hash = 0
+        # Play piles whose legal moves are refreshed at the end of the action in progress, None outside one
+        self.stale_moves = None
+        # Log level of the messages for the player, like invalid moves. Windowed games raise it to INFO.
+        self.feedback_level = logging.DEBUG
+
+    def setup(self, rng=None, deck=None):
+        """
+        Deal a new game. deck is the card codes in dealing order, DECK if not given.
+        Shuffle the deck with rng if one is given.
+        """
+        self.game_over = False
+        self.score = 500
+        self.reward = 0
+        self.journal.clear()
+        self.operations = []
+        self.no_of_moves_made = 0
+
+        deck = list(DECK if deck is None else deck)
+        if rng is not None:
+            rng.shuffle(deck)
+
+        # The pile arrays are kept from game to game, they may be shared with other objects
+        if self.piles is None:
+            self.piles = [array("B") for x in range(settings.PILE_COUNT)]
+        for pile in self.piles:
+            del pile[:]
+        # Put all the cards in the bottom face-down pile
+        self.piles[settings.BOTTOM_FACE_DOWN_PILE].extend(deck)
+
+        # Pull from that pile into the middle piles, all face-down
+        for pile_no in range(settings.PLAY_PILE_1, settings.PLAY_PILE_10 + 1):
+            # First six piles get 6 cards, the rest 5
+            self.place_cards(pile_no, 6 if pile_no < 6 else 5)
+
+        # Flip up the top cards
+        for i in range(settings.PLAY_PILE_1, settings.PLAY_PILE_10 + 1):
+            self.piles[i][-1] |= FACE_UP
+
+        self.rebuild_moves()
+        self.state_hash = self.compute_hash()
+        self.changed_from = [0] * settings.PILE_COUNT
+
+    def get_state(self):
+        """
+        Snapshot of the game as bytes: piles with their face-up flags, score and move counter.
+        The undo journal is not part of it.
+        """
+        return STATE_HEADER.pack(self.score, self.no_of_moves_made, *map(len, self.piles)) \
+            + b"".join(pile.tobytes() for pile in self.piles)
+
+    def set_state(self, state):
+        """ Restore a snapshot from get_state. Clears the undo journal. """
+        score, no_of_moves_made, *heights = STATE_HEADER.unpack_from(state)
+        self.score = int(score) if score.is_integer() else score
+        self.no_of_moves_made = no_of_moves_made
+        self.reward = 0
+        self.journal.clear()
+        self.operations = []
+        if self.piles is None:
+            self.piles = [array("B") for x in range(settings.PILE_COUNT)]
+        offset = STATE_HEADER.size
+        for pile, height in zip(self.piles, heights):
+            del pile[:]
+            pile.frombytes(state[offset:offset + height])
+            offset += height
+        self.game_over = heights[settings.FOUNDATION_PILE] == 104
+        self.rebuild_moves()
+        self.state_hash = self.compute_hash()
+        self.changed_from = [0] * settings.PILE_COUNT
+
+    def compute_hash(self):
+        """ Zobrist hash of the piles from scratch """
+        state_hash = 0
+        for pile_index, pile in enumerate(self.piles):
+            for card_index, card in enumerate(pile):
+                state_hash ^= zobrist_key(pile_index, card_index, card)
+        return state_hash
+
+    def place_cards(self, pile_no, i):
+        """ Deal the last i cards of the stock onto a pile one by one, the last card first """
+        stock = self.piles[settings.BOTTOM_FACE_DOWN_PILE]
+        self.piles[pile_no].extend(stock[:-i - 1:-1])
+        del stock[-i:]
+
+    def get_last_cards(self, exclude_pile=None):
+        """ Indices of all play piles whose last card is face up """
+        last_cards = []
+        for pile_index in range(settings.PLAY_PILE_1, settings.PLAY_PILE_10 + 1):
+            pile = self.piles[pile_index]
+            if pile_index != exclude_pile and pile and pile[-1] & FACE_UP:
+                last_cards.append(pile_index)
+        return last_cards
+
+    def get_movable_index(self, pile_index):
+        """
+        Index of the top card of the moveable stack at the end of a play pile.
+        Returns None for an empty pile or a face-down last card.
+        """
+        runs = self.runs[pile_index]
+        if not runs or not runs[-1]:
+            return None
+        return len(runs) - runs[-1]
+
+    def get_playable_cards(self):
+        """
+        Finds all the playable cards at a given state of the game. A playable card is one that can be moved.
+        If it belongs to a moveable stack then the top card of the stack is returned.
+        Returns a list of (pile index, card index) pairs.
+        """
+        playable_cards = []
+        for pile_index in range(settings.PLAY_PILE_1, settings.PLAY_PILE_10 + 1):
+            card_index = self.get_movable_index(pile_index)
+            if card_index is not None:
+                playable_cards.append((pile_index, card_index))
+        return playable_cards
+
+    def is_placable(self, card, pile_index):
+        """ Can card be put on top of the pile? """
+        pile = self.piles[pile_index]
+        if pile:
+            return (pile[-1] & VALUE_MASK) - (card & VALUE_MASK) == 1
+        return True
+
+    def stack_completed(self, pile_index):
+        """
+        Checks if the cards at the end of a pile make up a foundation, King to Ace in one suit.
+        Returns the index of the King or None.
+        """
+        pile = self.piles[pile_index]
+        if not pile or pile[-1] & VALUE_MASK != 0 or self.runs[pile_index][-1] < len(settings.CARD_VALUES):
+            return None
+        return len(pile) - len(settings.CARD_VALUES)
+
+    def pile_changed(self, pile_index, card_index):
+        """ Record that a pile changed from card_index upwards """
+        if card_index < self.changed_from[pile_index]:
+            self.changed_from[pile_index] = card_index
+        if pile_index < PLAY_PILE_COUNT:
+            self.update_runs(pile_index, card_index)
+            if self.stale_moves is None:
+                self.update_moves(pile_index)
+            else:
+                self.stale_moves.add(pile_index)
+
+    def begin_changes(self):
+        """ Hold back refreshing legal moves until end_changes, a pile changed twice is refreshed once """
+        self.stale_moves = set()
+
+    def end_changes(self):
+        for pile_index in self.stale_moves:
+            self.update_moves(pile_index)
+        self.stale_moves = None
+
+    def update_runs(self, pile_index, card_index):
+        """ Bring the run lengths and first face-up card of a play pile up to date from card_index upwards """
+        pile = self.piles[pile_index]
+        runs = self.runs[pile_index]
+        del runs[card_index:]
+        for i in range(card_index, len(pile)):
+            card = pile[i]
+            if not card & FACE_UP:
+                runs.append(0)
+            elif i and pile[i - 1] - card == 1:
+                # Face-up, same suit and one higher is exactly one more as an int.
+                # A face-down card below never is.
+                runs.append(runs[i - 1] + 1)
+            else:
+                runs.append(1)
+        if self.face_up_from[pile_index] >= card_index:
+            face_up_from = card_index
+            while face_up_from < len(pile) and not pile[face_up_from] & FACE_UP:
+                face_up_from += 1
+            self.face_up_from[pile_index] = face_up_from
+
+    def rebuild_moves(self):
+        """ Recompute the run lengths and legal moves of every play pile from scratch """
+        for pile_index in range(settings.PLAY_PILE_1, settings.PLAY_PILE_10 + 1):
+            self.face_up_from[pile_index] = 0
+            self.update_runs(pile_index, 0)
+        for pile_index in range(settings.PLAY_PILE_1, settings.PLAY_PILE_10 + 1):
+            pile = self.piles[pile_index]
+            movable_index = self.get_movable_index(pile_index)
+            self.top_values[pile_index] = pile[-1] & VALUE_MASK if pile else -1
+            self.movable_values[pile_index] = pile[movable_index] & VALUE_MASK if movable_index is not None else -1
+        # Piles each value can be put on: empty piles and piles ending one value higher
+        empty = bytes(top < 0 for top in self.top_values)
+        destinations = {}
+        for destination, top in enumerate(self.top_values):
+            if top >= 0:
+                destinations.setdefault(top - 1, bytearray(empty))[destination] = 1
+        move_mask = self.move_mask
+        for source, movable in enumerate(self.movable_values):
+            row = source * PLAY_PILE_COUNT
+            if movable < 0:
+                move_mask[row:row + PLAY_PILE_COUNT] = bytes(PLAY_PILE_COUNT)
+            else:
+                move_mask[row:row + PLAY_PILE_COUNT] = destinations.get(movable, empty)
+                move_mask[row + source] = 0
+
+    def update_moves(self, pile_index):
+        """ Refresh the legal moves from and to a play pile after it changed """
+        pile = self.piles[pile_index]
+        movable_index = self.get_movable_index(pile_index)
+        top = pile[-1] & VALUE_MASK if pile else -1
+        movable = pile[movable_index] & VALUE_MASK if movable_index is not None else -1
+        self.top_values[pile_index] = top
+        self.movable_values[pile_index] = movable
+        move_mask = self.move_mask
+        row = pile_index * PLAY_PILE_COUNT
+        for other in range(PLAY_PILE_COUNT):
+            if other == pile_index:
+                continue
+            # Moves from this pile
+            other_top = self.top_values[other]
+            move_mask[row + other] = movable >= 0 and (other_top < 0 or other_top - movable == 1)
+            # Moves to this pile
+            other_movable = self.movable_values[other]
+            move_mask[other * PLAY_PILE_COUNT + pile_index] = other_movable >= 0 and (top < 0 or top - other_movable == 1)
+
+    def can_deal(self):
+        return len(self.piles[settings.BOTTOM_FACE_DOWN_PILE]) > 0
+
+    def can_undo(self):
+        return len(self.journal) > 0
+
+    def move_cards(self, source_pile_index, destination_pile_index, count):
+        """ Move the last count cards of a pile on top of another pile """
+        source_pile = self.piles[source_pile_index]
+        destination_pile = self.piles[destination_pile_index]
+        destination_height = len(destination_pile)
+        source_height = len(source_pile) - count
+        state_hash = self.state_hash
+        for i in range(count):
+            card = source_pile[source_height + i]
+            state_hash ^= zobrist_key(source_pile_index, source_height + i, card) \
+                ^ zobrist_key(destination_pile_index, destination_height + i, card)
+        self.state_hash = state_hash
+        destination_pile.extend(source_pile[-count:])
+        del source_pile[-count:]
+        self.pile_changed(source_pile_index, len(source_pile))
+        self.pile_changed(destination_pile_index, destination_height)
+
+    def remove_stack(self, pile_index, card_index):
+        """ Move a completed stack to the foundation pile """
+        count = len(self.piles[pile_index]) - card_index
+        self.move_cards(pile_index, settings.FOUNDATION_PILE, count)
+        self.operations.append(("move", pile_index, settings.FOUNDATION_PILE, count))
+
+    def turn_top_card(self, pile_index):
+        """ Flip the last card of a pile over, either way """
+        pile = self.piles[pile_index]
+        card_index = len(pile) - 1
+        self.state_hash ^= zobrist_key(pile_index, card_index, pile[-1]) \
+            ^ zobrist_key(pile_index, card_index, pile[-1] ^ FACE_UP)
+        pile[-1] ^= FACE_UP
+        self.pile_changed(pile_index, card_index)
+
+    def flip_top_card(self, pile_index):
+        """ Turn over the last card of a pile if it is face down """
+        pile = self.piles[pile_index]
+        if pile and not pile[-1] & FACE_UP:
+            self.turn_top_card(pile_index)
+            self.operations.append(("flip", pile_index))
+            # Turning over a card adds 10 points
+            self.score += 10
+            self.reward += 10
+
+    def validate_move(self, source_pile_index, destination_pile_index, card_index=None):
+        """
+        Check a move against the rules. Both piles must be play piles, the card (the playable card if
+        card_index is None) must be in the moveable stack and fit on the destination.
+        Returns the index of the card in the source pile, or None if the move is invalid.
+        """
+        if not settings.PLAY_PILE_1 <= source_pile_index <= settings.PLAY_PILE_10:
+            return None
+        movable_index = self.get_movable_index(source_pile_index)
+        if card_index is None:
+            card_index = movable_index
+        if movable_index is None or card_index < movable_index \
+                or not settings.PLAY_PILE_1 <= destination_pile_index <= settings.PLAY_PILE_10 \
+                or destination_pile_index == source_pile_index:
+            return None
+        if not self.is_placable(self.piles[source_pile_index][card_index], destination_pile_index):
+            return None
+        return card_index
+
+    def move_card(self, source_pile_index, destination_pile_index, card_index=None):
+        """
+        Move a card (source) on top a last card in a pile or empty pile (destination).
+        The whole stack above the card goes with it.
+        INPUTS: source_pile_index: pile index for the card(s) to be moved from
+                destination_pile_index: pile index for the card(s) to be moved to
+                card_index: index of the card in the source pile, defaults to the playable card
+        Returns True if the move was made.
+        """
+        card_index = self.validate_move(source_pile_index, destination_pile_index, card_index)
+        if card_index is None:
+            logger.log(self.feedback_level, "Invalid move")
+            return False
+
+        source_pile = self.piles[source_pile_index]
+        if logger.isEnabledFor(logging.DEBUG):
+            source = source_pile[card_index]
+            logger.debug("Moving card with value %s and suit %s to pile %d",
+                         card_value(source), card_suit(source), destination_pile_index)
+
+        score, reward = self.score, self.reward
+        self.begin_changes()
+        count = len(source_pile) - card_index
+        self.move_cards(source_pile_index, destination_pile_index, count)
+        self.operations.append(("move", source_pile_index, destination_pile_index, count))
+        self.flip_top_card(source_pile_index)
+
+        # Check if the move resulted in forming a stack
+        king_index = self.stack_completed(destination_pile_index)
+        if king_index is not None:
+            logger.log(self.feedback_level, "Stack completed")
+            self.remove_stack(destination_pile_index, king_index)
+            # Add points
+            self.score += 130
+            self.reward += 130
+            self.flip_top_card(destination_pile_index)
+            # check if the game is over
+            if len(self.piles[settings.FOUNDATION_PILE]) == 104:
+                self.game_over = True
+
+        # Add a reward for correct move
+        self.reward += 1
+        self.end_changes()
+        self.end_action(score, reward)
+        return True
+
+    def deal(self):
+        """ Deal a card from the face-down pile on top of every non-empty play pile """
+        score, reward = self.score, self.reward
+        self.reward -= 5
+        self.score -= 10
+        stock = self.piles[settings.BOTTOM_FACE_DOWN_PILE]
+        self.begin_changes()
+        for pile_index in range(settings.PLAY_PILE_1, settings.PLAY_PILE_10 + 1):
+            pile = self.piles[pile_index]
+            if pile and stock:
+                self.move_cards(settings.BOTTOM_FACE_DOWN_PILE, pile_index, 1)
+                self.turn_top_card(pile_index)
+                self.operations.append(("move", settings.BOTTOM_FACE_DOWN_PILE, pile_index, 1))
+                self.operations.append(("flip", pile_index))
+        self.end_changes()
+        self.end_action(score, reward)
+
+    def end_action(self, score, reward):
+        """ Put the finished move or deal in the journal. score and reward are their values before it. """
+        self.journal.append((tuple(self.operations), self.score - score, self.reward - reward))
+        self.operations = []
+        self.no_of_moves_made += 1
+
+    def undo(self):
+        """
+        Reverse the last move or deal in the journal, including its score and reward.
+        Returns False if there is nothing to undo.
+        """
+        if not self.journal:
+            logger.log(self.feedback_level, "Nothing to undo")
+            return False
+        logger.debug("undo")
+        operations, score, reward = self.journal.pop()
+        self.begin_changes()
+        for operation in reversed(operations):
+            if operation[0] == "move":
+                kind, source_pile_index, destination_pile_index, count = operation
+                self.move_cards(destination_pile_index, source_pile_index, count)
+            else:
+                self.turn_top_card(operation[1])
+        self.end_changes()
+        self.score -= score
+        self.reward -= reward
+        self.game_over = len(self.piles[settings.FOUNDATION_PILE]) == 104
+        self.no_of_moves_made += 1
+        return True
+
+    def get_possible_moves(self):
+        """
+        Returns a dictionary of possible moves. The key is the (pile index, card index) of a card that can be played.
+        The item is a list of pile indices that the key card can be placed on.
+        """
+        possible_moves = {}
+        all_last_cards = self.get_last_cards()
+        # Check each playable card against top cards in a pile
+        for pile_index, card_index in self.get_playable_cards():
+            playable_card = self.piles[pile_index][card_index]
+            possible_moves[(pile_index, card_index)] = []
+            for last_pile_index in all_last_cards:
+                # Check accordance with the rules
+                if self.is_placable(playable_card, last_pile_index):
+                    possible_moves[(pile_index, card_index)].append(last_pile_index)
+        return possible_moves
@@ -0,0 +1,208 @@
+"""
+Gymnasium environment over the Spider rules engine. Runs without a window.
+"""
+import contextlib
+import logging
+import gymnasium as gym
+from gymnasium import spaces
+import numpy as np
+import deals
+import encoders
+import logs
+import profiling
+import settings
+import spider
+
+logger = logging.getLogger("spider.env")
+
+
+class SpiderEnv(gym.Env):
+    """ Headless Spider environment """
+    metadata = {"render_modes": ["human", "rgb_array"]}
+
+    def __init__(self, render_mode=None, copy_observations=True, catalogue=None, observation="grid", record_path=None):
+        """
+        With copy_observations=False, reset and step return the env's own observation buffer.
+        It is overwritten by the next step, so copy it if you keep it.
+        catalogue is an optional deals.DealCatalogue. reset() then picks its deals from it.
+        observation is the name of an encoder in encoders.ENCODERS, or an encoder of this env's own.
+        With record_path, every episode is appended to that recording, see recording.py.
+        """
+        self.render_mode = render_mode
+        self.copy_observations = copy_observations
+        self.catalogue = catalogue
+        # Deal of the current game, None for the unshuffled deck
+        self.deal_id = None
+        # Rules and game state
+        self.game = spider.SpiderGame()
+        # Only a human watching gets told about invalid moves and the like
+        if render_mode == "human":
+            self.game.feedback_level = logging.INFO
+            logs.lower_level(logging.INFO)
+        # Turns the piles into observations, all visible mats as (encoded value, encoded suit) by default
+        self.encoder = encoders.make_encoder(observation)
+        self.observation_space = self.encoder.observation_space
+        # Observation buffer, updated in place from the piles that changed
+        self.observations = np.zeros(self.observation_space.shape, dtype=self.observation_space.dtype)
+        # Action space as move/deal/undo, move(source, destination)
+        self.action_space = spaces.MultiDiscrete([3, 10, 10])
+        # Software renderer for rgb_array frames, made on first render
+        self.rasterizer = None
+        self.recorder = None
+        if record_path is not None:
+            import recording
+            self.recorder = recording.EpisodeRecorder(record_path)
+        # Phase timers and counters, only running inside profiling()
+        self.profiler = profiling.StepProfiler()
+
+    @property
+    def piles(self):
+        return self.game.piles
+
+    @property
+    def score(self):
+        return self.game.score
+
+    @property
+    def reward(self):
+        return self.game.reward
+
+    @property
+    def game_over(self):
+        return self.game.game_over
+
+    def setup(self):
+        """ Set up the game here. Call this function to restart the game. """
+        if self.deal_id is None:
+            self.game.setup()
+        elif self.catalogue is not None and self.deal_id in self.catalogue:
+            self.game.setup(deck=self.catalogue.deck(self.deal_id))
+        else:
+            self.game.setup(deck=deals.deck_for_deal(self.deal_id))
+
+    @property
+    def state_hash(self):
+        """ 64 bit Zobrist hash of the current position """
+        return self.game.state_hash
+
+    def get_state(self):
+        """ Picklable snapshot of the game, see SpiderGame.get_state """
+        return self.game.get_state()
+
+    def set_state(self, state):
+        """
+        Restore a snapshot from get_state. When recording, the open episode ends and a new one flagged
+        recording.FROM_STATE starts, its steps can't be replayed from the deal.
+        """
+        self.game.set_state(state)
+        if self.recorder is not None:
+            import recording
+            self.recorder.begin(self.deal_id, flags=recording.FROM_STATE)
+
+    def get_possible_moves(self):
+        return self.game.get_possible_moves()
+
+    @contextlib.contextmanager
+    def profiling(self, reset=False):
+        """
+        Time the phases of step and count actions inside a with block, see get_stats().
+        Outside of it the env runs uninstrumented. reset=True clears the stats first.
+        """
+        if reset:
+            self.profiler.reset()
+        self.profiler.attach(self)
+        try:
+            yield self.profiler
+        finally:
+            self.profiler.detach()
+
+    def get_stats(self):
+        """ Timers and counters gathered under profiling() """
+        return self.profiler.get_stats()
+
+    def render(self):
+        """ In rgb_array mode, the table as a (height, width, 3) uint8 frame. Needs no window. """
+        if self.render_mode != "rgb_array":
+            return None
+        if self.rasterizer is None:
+            # Loaded on first use, envs that never render don't import it
+            import rasterizer
+            self.rasterizer = rasterizer.Rasterizer()
+        return self.rasterizer.render(self.game)
+
+    def action_masks(self):
+        """
+        Legal actions, shaped like the action space: mask[action_type, source, destination].
+        Deal and undo ignore source and destination, so their rows are all one value.
+        """
+        mask = np.empty(self.action_space.nvec, dtype=bool)
+        mask[0] = np.frombuffer(self.game.move_mask, dtype=bool).reshape(spider.PLAY_PILE_COUNT, spider.PLAY_PILE_COUNT)
+        mask[1] = self.game.can_deal()
+        mask[2] = self.game.can_undo()
+        return mask
+
+    def update_observations(self):
+        """ Rewrite the parts of the observation buffer whose piles changed since the last update """
+        self.encoder.encode(self.observations, self.game)
+        self.game.changed_from[:] = [spider.NO_CHANGE] * settings.PILE_COUNT
+
+    def get_observations(self):
+        """
+        Returns observations in the encoder's format. By default a 2D numpy array where each row is a pile
+        in the game. Cards are represented as a tuple (encoded value, encoded suit).
+        If the card is not visible then it is -1.
+        """
+        self.update_observations()
+        if self.copy_observations:
+            return self.observations.copy()
+        return self.observations
+
+    def reset(self, seed=None, options=None):
+        """
+        Gymnasium API for initializing/resetting the game.
+        options={"deal_id": n} plays deal n. Otherwise a deal is drawn from the env's seeded generator,
+        out of the catalogue if there is one.
+        """
+        super().reset(seed=seed)
+        if options is not None and options.get("deal_id") is not None:
+            self.deal_id = int(options["deal_id"])
+        elif self.catalogue is not None:
+            self.deal_id = int(self.catalogue.deal_ids[self.np_random.integers(len(self.catalogue))])
+        else:
+            self.deal_id = int(self.np_random.integers(deals.DEAL_COUNT))
+        self.setup()
+        if self.recorder is not None:
+            self.recorder.begin(self.deal_id)
+        observation = self.get_observations()
+        return observation, {"action_mask": self.action_masks(), "deal_id": self.deal_id}
+
+    def step(self, action):
+        action_type, source, destination = action
+        logger.debug("step %d %d %d", action_type, source, destination)
+        if self.recorder is not None:
+            self.recorder.check_open()
+        # Reward is per action
+        self.game.reward = 0
+        try:
+            # Move card action type
+            if action_type == 0:
+                self.game.move_card(source, destination)
+            # Deal cards action type
+            elif action_type == 1:
+                self.game.deal()
+            elif action_type == 2:
+                self.game.undo()
+        except Exception:
+            logger.exception("step %d %d %d failed", action_type, source, destination)
+            logs.dump_recent()
+            raise
+
+        if self.recorder is not None:
+            self.recorder.record(action, self.game.reward, self.game.game_over)
+        observation = self.get_observations()
+        return observation, self.game.reward, self.game.game_over, False, {"action_mask": self.action_masks()}
+
+    def close(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
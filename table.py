@@ -0,0 +1,113 @@
+"""
+Sprites for the mats and cards, laid out from the state of a SpiderGame
+"""
+import arcade
+import cards
+import layout
+import settings
+import spider
+
+
+class Table:
+    """ Mats and card sprites. Call sync() after the game state changes. """
+
+    def __init__(self):
+        # Sprite list with all the mats tha cards lay on.
+        self.pile_mat_list: arcade.SpriteList = arcade.SpriteList()
+
+        # Create the 10 piles, the mat for the bottom face down pile and the foundation pile
+        for i in range(settings.PILE_COUNT):
+            pile = arcade.SpriteSolidColor(settings.MAT_WIDTH, settings.MAT_HEIGHT, arcade.csscolor.DARK_OLIVE_GREEN)
+            pile.position = layout.mat_position(i)
+            self.pile_mat_list.append(pile)
+
+        # Sprites not in any pile yet, by face-down card code
+        self.free_sprites = {}
+        for x in range(2):
+            for card_suit in settings.CARD_SUITS:
+                for card_value in settings.CARD_VALUES:
+                    card = cards.Card(card_suit, card_value, settings.CARD_SCALE)
+                    card.position = settings.START_X, settings.BOTTOM_Y
+                    key = spider.encode_card(settings.CARD_SUITS.index(card_suit), card.value_index)
+                    self.free_sprites.setdefault(key, []).append(card)
+
+        # Sprites in each pile, mirroring the game piles
+        self.pile_sprites = [[] for x in range(settings.PILE_COUNT)]
+        # A sprite list per pile holding the same sprites in the same order. Drawing the layers in
+        # layout.DRAW_ORDER puts every card at its (pile, depth) in z-order, and as piles only change
+        # at their ends, keeping them in step is popping and appending at the end of a list.
+        self.pile_layers = [arcade.SpriteList() for x in range(settings.PILE_COUNT)]
+        # Cards being dragged, drawn once more on top of everything
+        self.held_layer = arcade.SpriteList()
+        # Cards of each pile at the last sync
+        self.pile_cards = [bytes() for x in range(settings.PILE_COUNT)]
+        # sprite -> (pile index, card index)
+        self.locations = {}
+
+    def sync(self, game):
+        """ Move, flip and reorder the sprites to match the game piles. Only changed pile tails are touched. """
+        changes = []
+        # Release the sprites of every changed tail first, a moved card may land in an earlier pile
+        for pile_index, pile in enumerate(game.piles):
+            cards_now = pile.tobytes()
+            cards_before = self.pile_cards[pile_index]
+            if cards_now == cards_before:
+                continue
+            start = 0
+            shortest = min(len(cards_now), len(cards_before))
+            while start < shortest and cards_now[start] == cards_before[start]:
+                start += 1
+            layer = self.pile_layers[pile_index]
+            for sprite in self.pile_sprites[pile_index][start:]:
+                del self.locations[sprite]
+                key = spider.encode_card(settings.CARD_SUITS.index(sprite.suit), sprite.value_index)
+                self.free_sprites[key].append(sprite)
+                layer.pop()
+            del self.pile_sprites[pile_index][start:]
+            self.pile_cards[pile_index] = cards_now
+            changes.append((pile_index, start))
+
+        for pile_index, start in changes:
+            pile = game.piles[pile_index]
+            sprites = self.pile_sprites[pile_index]
+            layer = self.pile_layers[pile_index]
+            for card_index in range(start, len(pile)):
+                card = pile[card_index]
+                sprite = self.free_sprites[card & ~spider.FACE_UP].pop()
+                face_up = spider.card_is_face_up(card)
+                if face_up and not sprite.is_face_up:
+                    sprite.face_up()
+                elif not face_up and sprite.is_face_up:
+                    sprite.face_down()
+                sprite.position = layout.card_position(pile_index, card_index)
+                sprites.append(sprite)
+                layer.append(sprite)
+                self.locations[sprite] = (pile_index, card_index)
+
+    def top_card_at(self, point):
+        """ The card drawn on top at a point, None if there is no card. Found from the layout, not the sprites. """
+        location = layout.card_at(*point, self.pile_sprites)
+        if location is None:
+            return None
+        pile_index, card_index = location
+        return self.pile_sprites[pile_index][card_index]
+
+    def drop_pile(self, card_in_hand):
+        """ Index of the play pile the card in hand is dropped on, None if it touches none """
+        return layout.drop_pile(*card_in_hand.position, self.pile_sprites)
+
+    def hold(self, cards):
+        """ Draw cards being dragged on top of everything """
+        self.held_layer.extend(cards)
+
+    def release_held(self):
+        while len(self.held_layer):
+            self.held_layer.pop()
+
+    def draw(self):
+        #  draw mats
+        self.pile_mat_list.draw()
+        #  draw cards, pile by pile
+        for pile_index in layout.DRAW_ORDER:
+            self.pile_layers[pile_index].draw()
+        self.held_layer.draw()
@@ -0,0 +1,9 @@
+"""
+The game modules live at the top of the repo, put it on the import path of the tests.
+"""
+import os
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO not in sys.path:
+    sys.path.insert(0, REPO)
@@ -0,0 +1,33 @@
+"""
+Deal catalogue difficulty, scored from solver searches.
+"""
+import numpy as np
+import deals
+import solver
+import spider
+
+
+def test_difficulty_follows_search_progress():
+    records = deals.build_catalogue(range(20), max_nodes=100)
+    revealed = []
+    for record in records:
+        game = spider.SpiderGame()
+        game.setup(deck=record["deck"].tobytes())
+        search = solver.Solver(max_nodes=100)
+        assert search.solve(game) is None
+        revealed.append(search.cards_revealed + 13 * search.stacks_completed)
+    difficulty = records["difficulty"].astype(int)
+    assert ((difficulty >= 128) & (difficulty <= 255)).all()
+    # The further the search got, the easier the deal
+    order = np.argsort(revealed, kind="stable")
+    assert (np.diff(difficulty[order]) <= 0).all()
+    assert len(set(difficulty)) > 5
+
+
+def test_with_difficulty_selects_the_range():
+    catalogue = deals.DealCatalogue(deals.build_catalogue(range(10), max_nodes=50))
+    low, high = np.sort(catalogue.difficulty)[[2, 7]]
+    selected = catalogue.with_difficulty(low, high)
+    expected = [deal_id for deal_id, difficulty in zip(catalogue.deal_ids, catalogue.difficulty)
+                if low <= difficulty <= high]
+    np.testing.assert_array_equal(selected, expected)
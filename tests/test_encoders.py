@@ -0,0 +1,34 @@
+"""
+Every encoder only re-encodes the piles that changed. Its buffer must always match a fresh
+encoding of the same position.
+"""
+import random
+import numpy as np
+import pytest
+import encoders
+import spider_env
+
+STEPS = 200
+
+
+def random_action(env, rng):
+    """ A random action out of the env's action mask """
+    legal = np.argwhere(env.action_masks())
+    return tuple(int(x) for x in legal[rng.randrange(len(legal))])
+
+
+def fresh_observation(env, observation):
+    """ The observation of env's position encoded from scratch """
+    fresh = spider_env.SpiderEnv(observation=observation)
+    fresh.set_state(env.get_state())
+    return fresh.get_observations()
+
+
+@pytest.mark.parametrize("observation", sorted(encoders.ENCODERS))
+def test_incremental_encoding_matches_fresh(observation):
+    rng = random.Random(0)
+    env = spider_env.SpiderEnv(observation=observation)
+    observations, info = env.reset(options={"deal_id": 1})
+    for step in range(STEPS):
+        np.testing.assert_array_equal(observations, fresh_observation(env, observation), err_msg=f"step {step}")
+        observations, reward, terminated, truncated, info = env.step(random_action(env, rng))
@@ -0,0 +1,65 @@
+"""
+Consistency of the incremental engine state. Random legal actions, undo included, are played and
+after every step move_mask, runs, face_up_from, the top and movable values and state_hash are
+compared against a game rebuilt from scratch with set_state. Every move the mask allows must
+also be accepted by move_card.
+"""
+import random
+import pytest
+import deals
+import spider
+
+# Incrementally kept attributes compared against a rebuild
+ATTRIBUTES = ["move_mask", "runs", "face_up_from", "top_values", "movable_values", "state_hash"]
+DEALS = range(20)
+STEPS = 300
+
+
+def mismatches(game):
+    """ Names of the incremental attributes of game that differ from a from-scratch rebuild """
+    rebuilt = spider.SpiderGame()
+    rebuilt.set_state(game.get_state())
+    return [name for name in ATTRIBUTES if getattr(game, name) != getattr(rebuilt, name)]
+
+
+def mask_moves(game):
+    """ (source, destination) of every move in the move mask """
+    count = spider.PLAY_PILE_COUNT
+    return [divmod(index, count) for index, legal in enumerate(game.move_mask) if legal]
+
+
+def rejected_moves(game):
+    """ (source, destination) of every move the mask allows that move_card refuses """
+    state = game.get_state()
+    rejected = []
+    for source, destination in mask_moves(game):
+        probe = spider.SpiderGame()
+        probe.set_state(state)
+        if not probe.move_card(source, destination):
+            rejected.append((source, destination))
+    return rejected
+
+
+@pytest.mark.parametrize("deal_id", DEALS)
+def test_incremental_state_matches_rebuild(deal_id):
+    rng = random.Random(deal_id)
+    game = spider.SpiderGame()
+    game.setup(deck=deals.deck_for_deal(deal_id))
+    for step in range(STEPS):
+        actions = [("move", move) for move in mask_moves(game)]
+        if game.can_deal():
+            actions.append(("deal", None))
+        if game.can_undo():
+            actions.append(("undo", None))
+        if not actions or game.game_over:
+            break
+        kind, move = rng.choice(actions)
+        if kind == "move":
+            game.move_card(*move)
+        elif kind == "deal":
+            game.deal()
+        else:
+            game.undo()
+        where = f"step {step} after {kind} {move}"
+        assert mismatches(game) == [], where
+        assert rejected_moves(game) == [], where
@@ -0,0 +1,51 @@
+"""
+Headless envs stay silent when the application logs at INFO, human mode tells the player.
+"""
+import logging
+import pytest
+import logs
+import spider_env
+
+INVALID_MOVE = (0, 4, 4)
+UNDO = (2, 0, 0)
+
+
+@pytest.fixture
+def spider_level():
+    """ Put the spider logger's level back after the test, human mode lowers it """
+    level = logs.logger.level
+    yield
+    logs.logger.setLevel(level)
+
+
+def messages(caplog):
+    return [record.getMessage() for record in caplog.records if record.name.startswith("spider")]
+
+
+def test_headless_env_is_silent_under_root_info(caplog, spider_level):
+    caplog.set_level(logging.INFO)
+    env = spider_env.SpiderEnv(render_mode=None)
+    env.reset(options={"deal_id": 0})
+    env.step(INVALID_MOVE)
+    env.step(UNDO)
+    assert messages(caplog) == []
+
+
+def test_human_env_reports_invalid_moves(caplog, spider_level):
+    caplog.set_level(logging.INFO)
+    env = spider_env.SpiderEnv(render_mode="human")
+    env.reset(options={"deal_id": 0})
+    env.step(INVALID_MOVE)
+    env.step(UNDO)
+    assert messages(caplog) == ["Invalid move", "Nothing to undo"]
+    # A headless env next to it stays silent
+    caplog.clear()
+    headless = spider_env.SpiderEnv()
+    headless.reset(options={"deal_id": 0})
+    headless.step(INVALID_MOVE)
+    assert messages(caplog) == []
+
+
+def test_quiet_by_default():
+    assert logs.logger.level == logging.WARNING
+    assert any(isinstance(handler, logging.NullHandler) for handler in logs.logger.handlers)
@@ -0,0 +1,19 @@
+"""
+Phases of StepProfiler: every phase runs, move validation once per move_card call.
+"""
+import random
+import spider_env
+
+
+def test_phases_count_their_own_calls():
+    rng = random.Random(0)
+    env = spider_env.SpiderEnv()
+    env.reset(options={"deal_id": 0})
+    with env.profiling():
+        for step in range(300):
+            env.step((rng.randrange(3), rng.randrange(10), rng.randrange(10)))
+    phases = env.get_stats()["phases"]
+    assert all(phase["calls"] for phase in phases.values()), phases
+    assert phases["move_validation"]["calls"] == phases["move_card"]["calls"]
+    assert phases["move_validation"]["total_ns"] <= phases["move_card"]["total_ns"]
+    assert phases["step"]["calls"] == 300
@@ -0,0 +1,26 @@
+"""
+Progress stats the solver keeps when a search ends without a win.
+"""
+import pytest
+import deals
+import settings
+import solver
+import spider
+
+
+@pytest.mark.parametrize("beam_width", [None, 8])
+def test_best_position_is_recorded(beam_width):
+    game = spider.SpiderGame()
+    game.setup(deck=deals.deck_for_deal(2))
+    state = game.get_state()
+    hidden = sum(game.face_up_from)
+    search = solver.Solver(max_nodes=200, beam_width=beam_width)
+    assert search.solve(game) is None
+    assert game.get_state() == state
+    assert search.best_cost < solver.evaluate(game)
+    # The plan leads to the best position and the stats describe it
+    for action in search.best_plan:
+        solver.apply_action(game, action)
+    assert solver.evaluate(game) == search.best_cost
+    assert search.cards_revealed == hidden - sum(game.face_up_from)
+    assert search.stacks_completed == len(game.piles[settings.FOUNDATION_PILE]) // 13
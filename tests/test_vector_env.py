@@ -0,0 +1,182 @@
+"""
+VectorSpiderEnv against SpiderEnv: the same deals and actions must give the same observations,
+rewards, scores and action masks.
+"""
+import random
+import warnings
+import gymnasium as gym
+from gymnasium.wrappers.vector import RecordEpisodeStatistics
+import numpy as np
+import pytest
+import spider
+import spider_env
+import vector_env
+
+DEAL_IDS = [3, 14, 15, 92]
+STEPS = 200
+DEAL = (1, 0, 0)
+UNDO = (2, 0, 0)
+# Moving a pile onto itself is never legal
+INVALID_MOVE = (0, 4, 4)
+
+
+def random_action(env, rng, undo=True):
+    """ A random legal action of a single env, an invalid move if it is stuck """
+    mask = env.action_masks()
+    if not undo:
+        mask[2] = False
+    legal = np.argwhere(mask)
+    if not len(legal):
+        return INVALID_MOVE
+    return tuple(int(x) for x in legal[rng.randrange(len(legal))])
+
+
+def first_move(env):
+    """ The first legal move of a single env, a deal if there is none """
+    moves = np.argwhere(env.action_masks()[0])
+    if not len(moves):
+        return DEAL
+    return (0,) + tuple(int(x) for x in moves[0])
+
+
+def make_envs(deal_ids):
+    """ (vector env, list of single envs) playing deal_ids, after their reset """
+    vector = vector_env.VectorSpiderEnv(len(deal_ids))
+    vector.reset(options={"deal_ids": deal_ids})
+    singles = [spider_env.SpiderEnv() for x in deal_ids]
+    for env, deal_id in zip(singles, deal_ids):
+        env.reset(options={"deal_id": deal_id})
+    return vector, singles
+
+
+def step_all(vector, singles, actions):
+    """ Step every env, returns the vector results and the single ones stacked like them """
+    vector_results = vector.step(np.array(actions))
+    single_results = [env.step(action) for env, action in zip(singles, actions)]
+    observations = np.stack([result[0] for result in single_results])
+    rewards = np.array([result[1] for result in single_results], dtype=np.float32)
+    masks = np.stack([result[4]["action_mask"] for result in single_results])
+    return vector_results, (observations, rewards, masks)
+
+
+def assert_same(vector, singles, vector_results, single_results, where):
+    observations, rewards, terminated, truncated, info = vector_results
+    single_observations, single_rewards, single_masks = single_results
+    np.testing.assert_array_equal(observations, single_observations, err_msg=where)
+    np.testing.assert_array_equal(rewards, single_rewards, err_msg=where)
+    np.testing.assert_array_equal(info["action_mask"], single_masks, err_msg=where)
+    np.testing.assert_array_equal(vector.scores, [env.score for env in singles], err_msg=where)
+
+
+def test_reset_matches():
+    vector, singles = make_envs(DEAL_IDS)
+    np.testing.assert_array_equal(vector.get_observations(), np.stack([env.get_observations() for env in singles]))
+    np.testing.assert_array_equal(vector.action_masks(), np.stack([env.action_masks() for env in singles]))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_random_actions_match(seed):
+    rng = random.Random(seed)
+    vector, singles = make_envs(DEAL_IDS)
+    for step in range(STEPS):
+        actions = [random_action(env, rng) for env in singles]
+        results = step_all(vector, singles, actions)
+        assert_same(vector, singles, *results, where=f"step {step} actions {actions}")
+
+
+def test_invalid_move_matches():
+    vector, singles = make_envs(DEAL_IDS)
+    results = step_all(vector, singles, [INVALID_MOVE] * len(DEAL_IDS))
+    assert_same(vector, singles, *results, where="invalid move")
+
+
+def test_undo_goes_back_several_actions():
+    vector, singles = make_envs(DEAL_IDS)
+    rng = random.Random(0)
+    for step in range(20):
+        step_all(vector, singles, [random_action(env, rng, undo=False) for env in singles])
+    # Undo all of them, then undo is no longer allowed
+    for step in range(20):
+        results = step_all(vector, singles, [UNDO] * len(DEAL_IDS))
+        assert_same(vector, singles, *results, where=f"undo {step}")
+    assert not vector.action_masks()[:, 2].any()
+    start, start_singles = make_envs(DEAL_IDS)
+    np.testing.assert_array_equal(vector.get_observations(), start.get_observations())
+
+
+def test_undo_after_an_invalid_move_takes_back_the_move_before():
+    vector, singles = make_envs(DEAL_IDS)
+    for step, kind in enumerate(["move", "move", "undo", "invalid", "undo"]):
+        if kind == "move":
+            actions = [first_move(env) for env in singles]
+        elif kind == "undo":
+            actions = [UNDO] * len(DEAL_IDS)
+        else:
+            actions = [INVALID_MOVE] * len(DEAL_IDS)
+        results = step_all(vector, singles, actions)
+        assert_same(vector, singles, *results, where=f"step {step} {kind}")
+    # The last undo took back the first move, with its reward
+    assert (results[0][1] < 0).all()
+
+
+def test_full_undo_ring_drops_the_oldest_state():
+    vector = vector_env.VectorSpiderEnv(1, undo_depth=2)
+    vector.reset(options={"deal_ids": [0]})
+    deal = np.array([DEAL])
+    states = []
+    for step in range(3):
+        states.append(vector.get_observations())
+        vector.step(deal)
+    vector.step(np.array([UNDO]))
+    observations, rewards, terminated, truncated, info = vector.step(np.array([UNDO]))
+    np.testing.assert_array_equal(observations, states[1])
+    assert not info["action_mask"][:, 2].any()
+    # A third undo does nothing
+    observations, rewards, terminated, truncated, info = vector.step(np.array([UNDO]))
+    np.testing.assert_array_equal(observations, states[1])
+    assert rewards[0] == 0
+
+
+def almost_won(vector, env_index):
+    """
+    Lay out a game in env_index that moving pile 1 onto pile 0 wins: seven stacks in the foundation,
+    King to 2 of spades on pile 0 and the Ace on pile 1.
+    """
+    vector.cards[:, :, env_index] = 0
+    vector.heights[:, env_index] = 0
+    vector.heights[vector_env.FOUNDATION, env_index] = vector_env.DEPTH - vector_env.STACK_LENGTH
+    vector.cards[0, :12, env_index] = [value | spider.FACE_UP for value in range(12, 0, -1)]
+    vector.heights[0, env_index] = 12
+    vector.cards[1, 0, env_index] = spider.FACE_UP
+    vector.heights[1, env_index] = 1
+
+
+def test_finished_games_reset_in_the_same_step():
+    vector, singles = make_envs(DEAL_IDS)
+    almost_won(vector, 1)
+    last_observation = vector.get_observations()[1]
+    observations, rewards, terminated, truncated, info = vector.step(np.array([(0, 1, 0)] * len(DEAL_IDS)))
+    assert terminated.tolist() == [False, True, False, False]
+    assert info["_final_obs"].tolist() == [False, True, False, False]
+    final_observation = info["final_obs"][1]
+    # The run left pile 0 and the foundation is full
+    np.testing.assert_array_equal(final_observation[1], 0)
+    np.testing.assert_array_equal(final_observation[0], 0)
+    assert (final_observation[vector_env.FOUNDATION] != 0).all()
+    assert not (final_observation == last_observation).all()
+    assert info["final_info"]["deal_id"][1] == DEAL_IDS[1]
+    assert info["_final_info"].tolist() == [False, True, False, False]
+    # The returned observation is the first one of the new game
+    assert vector.heights[vector_env.FOUNDATION, 1] == 0
+    np.testing.assert_array_equal(observations[1], vector.get_observations()[1])
+
+
+def test_autoreset_mode_is_same_step():
+    vector = vector_env.VectorSpiderEnv(2)
+    assert vector.metadata["autoreset_mode"] == gym.vector.AutoresetMode.SAME_STEP
+    # Wrappers read the mode from the metadata and accept it without warnings
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        wrapped = RecordEpisodeStatistics(vector)
+        wrapped.reset(seed=0)
+        wrapped.step(np.zeros((2, 3), dtype=np.int64))
@@ -0,0 +1,57 @@
+"""
+SpiderWorkerPool autoreset: games that finish are dealt again in the same step and their last
+observation comes back in info["final_obs"].
+"""
+import warnings
+import gymnasium as gym
+from gymnasium.wrappers.vector import RecordEpisodeStatistics
+import numpy as np
+import pytest
+import spider_env
+import worker_pool
+
+
+@pytest.fixture
+def deal_finishes(monkeypatch):
+    """ Make a deal end the game, forked workers inherit the patch """
+    step = spider_env.SpiderEnv.step
+
+    def finishing_step(env, action):
+        observation, reward, terminated, truncated, info = step(env, action)
+        return observation, reward, terminated or action[0] == 1, truncated, info
+
+    monkeypatch.setattr(spider_env.SpiderEnv, "step", finishing_step)
+
+
+def test_finished_games_reset_in_the_same_step(deal_finishes):
+    pool = worker_pool.SpiderWorkerPool(num_workers=2, envs_per_worker=2, context="fork")
+    try:
+        observations, info = pool.reset(options={"deal_ids": [3, 14, 15, 92]})
+        # Env 2 deals, the others make an invalid move
+        actions = np.zeros((4, 3), dtype=np.int64)
+        actions[2] = (1, 0, 0)
+        dealt = observations[2].copy()
+        new_observations, rewards, terminated, truncated, info = pool.step(actions)
+        assert terminated.tolist() == [False, False, True, False]
+        assert info["_final_obs"].tolist() == [False, False, True, False]
+        assert info["final_info"]["deal_id"][2] == 15
+        assert info["_final_info"].tolist() == [False, False, True, False]
+        # The final observation shows the dealt cards, the returned one a new game
+        final_observation = info["final_obs"][2]
+        assert not np.array_equal(final_observation, dealt)
+        assert not np.array_equal(final_observation, new_observations[2])
+    finally:
+        pool.close()
+
+
+def test_autoreset_mode_is_same_step():
+    pool = worker_pool.SpiderWorkerPool(num_workers=1, envs_per_worker=2, context="fork")
+    try:
+        assert pool.metadata["autoreset_mode"] == gym.vector.AutoresetMode.SAME_STEP
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            wrapped = RecordEpisodeStatistics(pool)
+            wrapped.reset(seed=0)
+            wrapped.step(np.zeros((2, 3), dtype=np.int64))
+    finally:
+        pool.close()
@@ -0,0 +1,321 @@
+"""
+Many Spider games stepped together with NumPy. Same rules, rewards and card
+encoding as spider.SpiderGame.
+"""
+import gymnasium as gym
+from gymnasium import spaces
+from gymnasium.vector.utils import batch_space
+import numpy as np
+import deals
+import settings
+import spider
+
+DEPTH = 104
+PLAY_PILES = settings.PLAY_PILE_10 + 1
+STOCK = settings.BOTTOM_FACE_DOWN_PILE
+FOUNDATION = settings.FOUNDATION_PILE
+STACK_LENGTH = len(settings.CARD_VALUES)
+
+
+def _initial_layout():
+    """ (pile, depth) of every deck position after SpiderGame.setup deals it out """
+    game = spider.SpiderGame()
+    game.piles = [list() for x in range(settings.PILE_COUNT)]
+    game.piles[STOCK] = list(range(DEPTH))
+    for pile_no in range(settings.PLAY_PILE_1, PLAY_PILES):
+        game.place_cards(pile_no, 6 if pile_no < 6 else 5)
+    piles = np.empty(DEPTH, dtype=np.intp)
+    depths = np.empty(DEPTH, dtype=np.intp)
+    for pile_index, pile in enumerate(game.piles):
+        for card_index, deck_index in enumerate(pile):
+            piles[deck_index] = pile_index
+            depths[deck_index] = card_index
+    heights = np.array([len(pile) for pile in game.piles], dtype=np.int16)
+    return piles, depths, heights
+
+
+LAYOUT_PILES, LAYOUT_DEPTHS, LAYOUT_HEIGHTS = _initial_layout()
+
+
+def _run_start(rows, heights):
+    """
+    Index of the top card of the moveable stack at the end of each row.
+    rows is (m, DEPTH), heights is (m,). Empty rows give 0.
+    """
+    rows = rows.astype(np.int16)
+    depth = np.arange(rows.shape[1])
+    # A card extends the run if the card below it is exactly one more
+    linked = np.zeros(rows.shape, dtype=bool)
+    linked[:, 1:] = rows[:, :-1] - rows[:, 1:] == 1
+    breaks = ~linked & (depth < heights[:, None])
+    return np.where(breaks, depth, 0).max(axis=1)
+
+
+class VectorSpiderEnv(gym.vector.VectorEnv):
+    """
+    N Spider games held as arrays. cards is (piles, depth, batch) and heights
+    is (piles, batch). Actions are a batch of MultiDiscrete([3, 10, 10]).
+    Finished games are dealt again automatically in the same step (gymnasium's SAME_STEP autoreset);
+    the returned observation is then the first one of the new game. The last observation of the
+    finished game is in info["final_obs"] and its deal in info["final_info"]["deal_id"], both with
+    the usual "_final_obs"/"_final_info" masks.
+    Undo restores the state, score and reward from before the last move or deal. Like the engine's
+    journal, each env keeps up to undo_depth of them, settings.UNDO_LIMIT by default.
+    """
+    metadata = {"render_modes": [], "autoreset_mode": gym.vector.AutoresetMode.SAME_STEP}
+
+    def __init__(self, num_envs, catalogue=None, undo_depth=settings.UNDO_LIMIT):
+        """
+        catalogue is an optional deals.DealCatalogue to draw the deals from.
+        undo_depth is how many moves and deals each env can take back, at least 1.
+        """
+        self.num_envs = num_envs
+        self.catalogue = catalogue
+        self.render_mode = None
+        self.single_observation_space = spaces.Box(low=-1, high=13, shape=(settings.PILE_COUNT, DEPTH, 2), dtype=np.int8)
+        self.single_action_space = spaces.MultiDiscrete([3, 10, 10])
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+
+        self.cards = np.zeros((settings.PILE_COUNT, DEPTH, num_envs), dtype=np.uint8)
+        self.heights = np.zeros((settings.PILE_COUNT, num_envs), dtype=np.int16)
+        self.scores = np.zeros(num_envs, dtype=np.int64)
+        # Undo ring of every env: the states before its last moves and deals, with their rewards.
+        # A game always holds all 104 cards, so a state packs into its cards in pile order plus the heights.
+        self.undo_depth = undo_depth
+        self.history_cards = np.zeros((num_envs, undo_depth, DEPTH), dtype=np.uint8)
+        self.history_heights = np.zeros((num_envs, undo_depth, settings.PILE_COUNT), dtype=np.int16)
+        self.history_scores = np.zeros((num_envs, undo_depth), dtype=np.int64)
+        self.history_rewards = np.zeros((num_envs, undo_depth), dtype=np.float32)
+        # Slot the next state goes into and how many states can be undone
+        self.undo_top = np.zeros(num_envs, dtype=np.intp)
+        self.undo_count = np.zeros(num_envs, dtype=np.intp)
+        # Envs that made a move or deal in the current step
+        self.acted = np.zeros(num_envs, dtype=bool)
+        self.np_random = np.random.default_rng()
+        # Deal of the game in each env
+        self.deal_ids = np.zeros(num_envs, dtype=np.uint32)
+
+    def _deal_new_games(self, env_indices, deal_ids=None):
+        """ Lay out fresh games in the given envs. Deals are drawn at random if deal_ids is None. """
+        count = len(env_indices)
+        if deal_ids is None and self.catalogue is not None:
+            rows = self.np_random.integers(len(self.catalogue), size=count)
+            deal_ids = self.catalogue.deal_ids[rows]
+            decks = self.catalogue.records["deck"][rows]
+        else:
+            if deal_ids is None:
+                deal_ids = self.np_random.integers(deals.DEAL_COUNT, size=count)
+            decks = self._decks(deal_ids)
+        self.deal_ids[env_indices] = deal_ids
+        self.cards[:, :, env_indices] = 0
+        self.cards[LAYOUT_PILES[:, None], LAYOUT_DEPTHS[:, None], env_indices[None, :]] = decks.T
+        self.heights[:, env_indices] = LAYOUT_HEIGHTS[:, None]
+        # Flip up the top cards
+        for pile_index in range(settings.PLAY_PILE_1, PLAY_PILES):
+            self.cards[pile_index, LAYOUT_HEIGHTS[pile_index] - 1, env_indices] |= spider.FACE_UP
+        self.scores[env_indices] = 500
+        self.undo_count[env_indices] = 0
+
+    def _decks(self, deal_ids):
+        """
+        Decks of deal ids, (count, 104) uint8. Taken from the catalogue if there is one, deals missing
+        from it are shuffled with deals.deck_for_deal like SpiderEnv does.
+        """
+        decks = np.empty((len(deal_ids), DEPTH), dtype=np.uint8)
+        missing = np.ones(len(deal_ids), dtype=bool)
+        if self.catalogue is not None and len(self.catalogue):
+            rows = np.minimum(np.searchsorted(self.catalogue.deal_ids, deal_ids), len(self.catalogue) - 1)
+            missing = self.catalogue.deal_ids[rows] != deal_ids
+            decks[~missing] = self.catalogue.records["deck"][rows[~missing]]
+        for index in np.flatnonzero(missing):
+            decks[index] = np.frombuffer(deals.deck_for_deal(int(deal_ids[index])), dtype=np.uint8)
+        return decks
+
+    def reset(self, seed=None, options=None):
+        """
+        options={"deal_ids": [...]} plays those deals, one per env. Deals missing from the catalogue,
+        if there is one, are shuffled with deals.deck_for_deal.
+        """
+        if seed is not None:
+            self.np_random = np.random.default_rng(seed)
+        deal_ids = None
+        if options is not None and options.get("deal_ids") is not None:
+            deal_ids = np.asarray(options["deal_ids"], dtype=np.uint32)
+        self._deal_new_games(np.arange(self.num_envs), deal_ids)
+        return self.get_observations(), {"action_mask": self.action_masks(), "deal_ids": self.deal_ids.copy()}
+
+    def get_observations(self):
+        """
+        Batched observations, (batch, piles, depth, 2). Face-up cards are (encoded value, encoded suit),
+        face-down cards are -1 and empty slots 0.
+        """
+        cards = self.cards.transpose(2, 0, 1)
+        present = np.arange(DEPTH) < self.heights.T[:, :, None]
+        face_up = (cards & spider.FACE_UP) != 0
+        observations = np.zeros(cards.shape + (2,), dtype=np.int8)
+        observations[..., 0] = (cards & spider.VALUE_MASK) + 1
+        observations[..., 1] = (cards >> spider.SUIT_SHIFT & 0x3) + 1
+        observations[~face_up] = -1
+        observations[~present] = 0
+        return observations
+
+    def action_masks(self):
+        """
+        Legal actions for every env, (batch, 3, 10, 10), like SpiderEnv.action_masks.
+        Built from the last and playable card of each play pile.
+        """
+        heights = self.heights[:PLAY_PILES]
+        rows = self.cards[:PLAY_PILES].transpose(0, 2, 1).reshape(-1, DEPTH)
+        flat_heights = heights.reshape(-1)
+        starts = _run_start(rows, flat_heights)
+        movable = (rows[np.arange(len(rows)), starts] & spider.VALUE_MASK).astype(np.int16).reshape(PLAY_PILES, -1)
+        tops = (rows[np.arange(len(rows)), np.maximum(flat_heights - 1, 0)] & spider.VALUE_MASK).astype(np.int16)
+        tops = tops.reshape(PLAY_PILES, -1)
+        # [source, destination, env]
+        moves = (heights[:, None, :] > 0) \
+            & ((heights[None, :, :] == 0) | (tops[None, :, :] - movable[:, None, :] == 1)) \
+            & ~np.eye(PLAY_PILES, dtype=bool)[:, :, None]
+        mask = np.empty((self.num_envs,) + tuple(self.single_action_space.nvec), dtype=bool)
+        mask[:, 0] = moves.transpose(2, 0, 1)
+        mask[:, 1] = (self.heights[STOCK] > 0)[:, None, None]
+        mask[:, 2] = (self.undo_count > 0)[:, None, None]
+        return mask
+
+    def _top_cards(self, piles, env_indices):
+        return self.cards[piles, np.maximum(self.heights[piles, env_indices] - 1, 0), env_indices]
+
+    def _save_previous(self, env_indices):
+        """ Push the current state of the envs onto their undo rings, the oldest one drops off a full ring """
+        slots = self.undo_top[env_indices]
+        cards = self.cards[:, :, env_indices].transpose(2, 0, 1)
+        heights = self.heights[:, env_indices].T
+        present = np.arange(DEPTH) < heights[:, :, None]
+        self.history_cards[env_indices, slots] = cards[present].reshape(-1, DEPTH)
+        self.history_heights[env_indices, slots] = heights
+        self.history_scores[env_indices, slots] = self.scores[env_indices]
+        self.undo_top[env_indices] = (slots + 1) % self.undo_depth
+        self.undo_count[env_indices] = np.minimum(self.undo_count[env_indices] + 1, self.undo_depth)
+        self.acted[env_indices] = True
+
+    def _flip_top_cards(self, piles, env_indices, rewards):
+        """ Turn over the last card of each pile if it is face down """
+        heights = self.heights[piles, env_indices]
+        top = self._top_cards(piles, env_indices)
+        flip = (heights > 0) & ((top & spider.FACE_UP) == 0)
+        piles, env_indices = piles[flip], env_indices[flip]
+        self.cards[piles, heights[flip] - 1, env_indices] |= spider.FACE_UP
+        # Turning over a card adds 10 points
+        self.scores[env_indices] += 10
+        rewards[env_indices] += 10
+
+    def _move(self, sources, destinations, env_indices, rewards):
+        source_heights = self.heights[sources, env_indices]
+        destination_heights = self.heights[destinations, env_indices]
+        source_rows = self.cards[sources, :, env_indices]
+        starts = _run_start(source_rows, source_heights)
+        moving = source_rows[np.arange(len(env_indices)), starts]
+        top_face_up = (self._top_cards(sources, env_indices) & spider.FACE_UP) != 0
+        destination_tops = self._top_cards(destinations, env_indices)
+
+        # Check accordance with the rules
+        valid = (source_heights > 0) & top_face_up & (sources != destinations) \
+            & ((destination_heights == 0)
+               | ((destination_tops & spider.VALUE_MASK).astype(np.int16) - (moving & spider.VALUE_MASK) == 1))
+        if not valid.any():
+            return
+        sources, destinations, env_indices = sources[valid], destinations[valid], env_indices[valid]
+        source_rows, starts = source_rows[valid], starts[valid]
+        source_heights, destination_heights = source_heights[valid], destination_heights[valid]
+        self._save_previous(env_indices)
+
+        # Copy the run onto the end of the destination pile
+        counts = source_heights - starts
+        depth = np.arange(DEPTH)
+        offsets = depth - destination_heights[:, None]
+        placed = (offsets >= 0) & (offsets < counts[:, None])
+        taken = np.take_along_axis(source_rows, np.clip(offsets + starts[:, None], 0, DEPTH - 1), axis=1)
+        self.cards[destinations, :, env_indices] = np.where(placed, taken, self.cards[destinations, :, env_indices])
+        self.heights[destinations, env_indices] += counts
+        self.heights[sources, env_indices] = starts
+        rewards[env_indices] += 1
+        self._flip_top_cards(sources, env_indices, rewards)
+        self._remove_stacks(destinations, env_indices, rewards)
+
+    def _remove_stacks(self, piles, env_indices, rewards):
+        """ Move completed King to Ace stacks at the end of the piles to the foundation """
+        heights = self.heights[piles, env_indices]
+        rows = self.cards[piles, :, env_indices]
+        starts = _run_start(rows, heights)
+        tops = self._top_cards(piles, env_indices)
+        completed = (heights - starts >= STACK_LENGTH) & ((tops & spider.VALUE_MASK) == 0)
+        if not completed.any():
+            return
+        piles, env_indices = piles[completed], env_indices[completed]
+        rows, heights = rows[completed], heights[completed]
+        foundation_heights = self.heights[FOUNDATION, env_indices]
+        stack = np.arange(STACK_LENGTH)
+        self.cards[FOUNDATION, foundation_heights[:, None] + stack, env_indices[:, None]] = \
+            np.take_along_axis(rows, heights[:, None] - STACK_LENGTH + stack, axis=1)
+        self.heights[FOUNDATION, env_indices] += STACK_LENGTH
+        self.heights[piles, env_indices] -= STACK_LENGTH
+        self.scores[env_indices] += 130
+        rewards[env_indices] += 130
+        self._flip_top_cards(piles, env_indices, rewards)
+
+    def _deal(self, env_indices, rewards):
+        """ Deal a card from the face-down pile on top of every non-empty play pile """
+        self._save_previous(env_indices)
+        rewards[env_indices] -= 5
+        self.scores[env_indices] -= 10
+        for pile_index in range(settings.PLAY_PILE_1, PLAY_PILES):
+            stock_heights = self.heights[STOCK, env_indices]
+            dealing = (self.heights[pile_index, env_indices] > 0) & (stock_heights > 0)
+            envs = env_indices[dealing]
+            card = self.cards[STOCK, stock_heights[dealing] - 1, envs] | spider.FACE_UP
+            self.cards[pile_index, self.heights[pile_index, envs], envs] = card
+            self.heights[pile_index, envs] += 1
+            self.heights[STOCK, envs] -= 1
+
+    def _undo(self, env_indices, rewards):
+        """ Go back to the state before the last move or deal, taking back its score and reward """
+        env_indices = env_indices[self.undo_count[env_indices] > 0]
+        slots = (self.undo_top[env_indices] - 1) % self.undo_depth
+        heights = self.history_heights[env_indices, slots]
+        present = np.arange(DEPTH) < heights[:, :, None]
+        cards = np.zeros(present.shape, dtype=np.uint8)
+        cards[present] = self.history_cards[env_indices, slots].reshape(-1)
+        self.cards[:, :, env_indices] = cards.transpose(1, 2, 0)
+        self.heights[:, env_indices] = heights.T
+        self.scores[env_indices] = self.history_scores[env_indices, slots]
+        rewards[env_indices] -= self.history_rewards[env_indices, slots]
+        self.undo_top[env_indices] = slots
+        self.undo_count[env_indices] -= 1
+
+    def step(self, actions):
+        actions = np.asarray(actions).reshape(self.num_envs, 3)
+        action_types, sources, destinations = actions[:, 0], actions[:, 1], actions[:, 2]
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        env_indices = np.arange(self.num_envs)
+
+        self.acted[:] = False
+        moves = action_types == 0
+        self._move(sources[moves], destinations[moves], env_indices[moves], rewards)
+        self._deal(env_indices[action_types == 1], rewards)
+        self._undo(env_indices[action_types == 2], rewards)
+        # The reward of a move or deal goes with its state on the ring, undo takes it back
+        acted = env_indices[self.acted]
+        self.history_rewards[acted, (self.undo_top[acted] - 1) % self.undo_depth] = rewards[acted]
+
+        terminated = self.heights[FOUNDATION] == DEPTH
+        truncated = np.zeros(self.num_envs, dtype=bool)
+        infos = {}
+        if terminated.any():
+            finished = env_indices[terminated]
+            final_observations = self.get_observations()
+            for env_index in finished:
+                infos = self._add_info(infos, {"final_obs": final_observations[env_index],
+                                               "final_info": {"deal_id": self.deal_ids[env_index]}}, env_index)
+            self._deal_new_games(finished)
+        infos["action_mask"] = self.action_masks()
+        return self.get_observations(), rewards, terminated, truncated, infos
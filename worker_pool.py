@@ -0,0 +1,237 @@
+"""
+Headless Spider environments stepped in worker processes. Observations, rewards,
+dones and action masks are written straight into shared memory, actions go to the
+workers as raw bytes through a pipe, so nothing is pickled per step.
+"""
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+import pickle
+import traceback
+import gymnasium as gym
+from gymnasium import spaces
+from gymnasium.vector.utils import batch_space
+import numpy as np
+import encoders
+import logs
+import spider
+import spider_env
+
+# Commands, the first byte of every message to a worker
+STEP, RESET, CLOSE = b"\x00", b"\x01", b"\x02"
+# Reply of a worker that failed, followed by the traceback
+ERROR = b"\x03"
+
+ACTION_DTYPE = np.uint8
+
+
+def _buffer_layout(num_envs, observation_space):
+    """ (name, dtype, shape) of every shared array """
+    return [
+        ("observations", observation_space.dtype, (num_envs,) + observation_space.shape),
+        ("rewards", np.float32, (num_envs,)),
+        ("terminated", np.bool_, (num_envs,)),
+        ("action_masks", np.bool_, (num_envs, 3, spider.PLAY_PILE_COUNT, spider.PLAY_PILE_COUNT)),
+        ("deal_ids", np.uint32, (num_envs,)),
+    ]
+
+
+def _attach(names, num_envs, observation_space):
+    """ Map the shared arrays created by the pool. Returns (blocks, arrays). """
+    blocks = {}
+    arrays = {}
+    for name, dtype, shape in _buffer_layout(num_envs, observation_space):
+        blocks[name] = shared_memory.SharedMemory(name=names[name])
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf)
+    return blocks, arrays
+
+
+def _worker(connection, names, num_envs, start, stop, catalogue, observation, ring_buffer_capacity):
+    """ Runs envs start to stop of the pool until told to close """
+    if ring_buffer_capacity:
+        logs.enable_ring_buffer(ring_buffer_capacity)
+    envs = [spider_env.SpiderEnv(copy_observations=False, catalogue=catalogue, observation=observation)
+            for x in range(start, stop)]
+    blocks, arrays = _attach(names, num_envs, envs[0].observation_space)
+    for env_index, env in enumerate(envs, start):
+        # Observations are updated in place right in the shared buffer
+        env.observations = arrays["observations"][env_index]
+    try:
+        while True:
+            message = connection.recv_bytes()
+            command = message[:1]
+            reply = b""
+            if command == STEP:
+                actions = np.frombuffer(message, dtype=ACTION_DTYPE, offset=1).reshape(-1, 3).tolist()
+                # (env index, last observation, deal id) of the games that finished
+                finished = []
+                for env_index, env, action in zip(range(start, stop), envs, actions):
+                    observation, reward, terminated, truncated, info = env.step(action)
+                    if terminated:
+                        finished.append((env_index, observation.copy(), env.deal_id))
+                        # Deal a new game, the observation is then the first one of it
+                        observation, info = env.reset()
+                        arrays["deal_ids"][env_index] = env.deal_id
+                    arrays["rewards"][env_index] = reward
+                    arrays["terminated"][env_index] = terminated
+                    arrays["action_masks"][env_index] = info["action_mask"]
+                if finished:
+                    reply = pickle.dumps(finished)
+            elif command == RESET:
+                seed, deal_ids = pickle.loads(message[1:])
+                for env_index, env in enumerate(envs, start):
+                    options = None if deal_ids is None else {"deal_id": deal_ids[env_index]}
+                    observation, info = env.reset(seed=None if seed is None else seed + env_index, options=options)
+                    arrays["rewards"][env_index] = 0
+                    arrays["terminated"][env_index] = False
+                    arrays["action_masks"][env_index] = info["action_mask"]
+                    arrays["deal_ids"][env_index] = info["deal_id"]
+            elif command == CLOSE:
+                break
+            connection.send_bytes(reply)
+    except (KeyboardInterrupt, EOFError):
+        pass
+    except Exception:
+        report = traceback.format_exc()
+        if logs.ring_buffer is not None:
+            report += "Recent events:\n" + logs.ring_buffer.format_records()
+        connection.send_bytes(ERROR + report.encode())
+    finally:
+        # The arrays hold on to the shared memory until they are gone
+        observation = None
+        envs.clear()
+        arrays.clear()
+        for block in blocks.values():
+            block.close()
+        connection.close()
+
+
+class SpiderWorkerPool(gym.vector.VectorEnv):
+    """
+    num_workers processes with envs_per_worker headless SpiderEnvs each, stepped like
+    VectorSpiderEnv. Finished games are dealt again automatically in the same step (gymnasium's
+    SAME_STEP autoreset); the returned observation is then the first one of the new game. The last
+    observation of the finished game is in info["final_obs"] and its deal in
+    info["final_info"]["deal_id"], both with the usual "_final_obs"/"_final_info" masks.
+    With copy_observations=False, reset and step return views of the shared buffers.
+    They are overwritten by the next step, so copy them if you keep them.
+    """
+    metadata = {"render_modes": [], "autoreset_mode": gym.vector.AutoresetMode.SAME_STEP}
+
+    def __init__(self, num_workers=None, envs_per_worker=1, catalogue=None, copy_observations=True, context=None,
+                 observation="grid", ring_buffer_capacity=0):
+        """
+        num_workers defaults to one per core. catalogue is an optional deals.DealCatalogue
+        to draw the deals from. context is a multiprocessing start method, e.g. "spawn".
+        observation names the encoder of every env, see encoders.ENCODERS.
+        With ring_buffer_capacity, each worker keeps that many recent log events and sends
+        them along with the traceback when it fails.
+        """
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+        self.num_workers = num_workers
+        self.envs_per_worker = envs_per_worker
+        self.num_envs = num_workers * envs_per_worker
+        self.copy_observations = copy_observations
+        self.render_mode = None
+        self.single_observation_space = encoders.make_encoder(observation).observation_space
+        self.single_action_space = spaces.MultiDiscrete([3, 10, 10])
+        self.observation_space = batch_space(self.single_observation_space, self.num_envs)
+        self.action_space = batch_space(self.single_action_space, self.num_envs)
+
+        # Shared arrays, by name
+        self.blocks = {}
+        self.arrays = {}
+        for name, dtype, shape in _buffer_layout(self.num_envs, self.single_observation_space):
+            size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            self.blocks[name] = shared_memory.SharedMemory(create=True, size=size)
+            self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=self.blocks[name].buf)
+            self.arrays[name][...] = 0
+        names = {name: block.name for name, block in self.blocks.items()}
+
+        self.actions = np.zeros((self.num_envs, 3), dtype=ACTION_DTYPE)
+        context = multiprocessing.get_context(context)
+        self.connections = []
+        self.processes = []
+        for worker_index in range(num_workers):
+            start = worker_index * envs_per_worker
+            parent_connection, child_connection = context.Pipe()
+            process = context.Process(
+                target=_worker,
+                args=(child_connection, names, self.num_envs, start, start + envs_per_worker, catalogue, observation,
+                      ring_buffer_capacity),
+                daemon=True)
+            process.start()
+            child_connection.close()
+            self.connections.append(parent_connection)
+            self.processes.append(process)
+
+    def _command(self, messages):
+        """ Send one message to every worker and wait until all of them are done. Returns their replies. """
+        for connection, message in zip(self.connections, messages):
+            connection.send_bytes(message)
+        errors = []
+        replies = []
+        for connection in self.connections:
+            reply = connection.recv_bytes()
+            if reply[:1] == ERROR:
+                errors.append(reply[1:].decode())
+            replies.append(reply)
+        if errors:
+            raise RuntimeError("Spider worker failed:\n" + "\n".join(errors))
+        return replies
+
+    def _results(self):
+        observations = self.arrays["observations"]
+        action_masks = self.arrays["action_masks"]
+        if self.copy_observations:
+            return observations.copy(), action_masks.copy()
+        return observations, action_masks
+
+    def reset(self, seed=None, options=None):
+        """
+        options={"deal_ids": [...]} plays those deals, one per env. Env i is seeded with seed + i,
+        which makes the whole pool reproducible.
+        """
+        deal_ids = None
+        if options is not None and options.get("deal_ids") is not None:
+            deal_ids = [int(deal_id) for deal_id in options["deal_ids"]]
+        self._command([RESET + pickle.dumps((seed, deal_ids))] * self.num_workers)
+        observations, action_masks = self._results()
+        return observations, {"action_mask": action_masks, "deal_ids": self.arrays["deal_ids"].copy()}
+
+    def step(self, actions):
+        self.actions[...] = np.asarray(actions).reshape(self.num_envs, 3)
+        step = self.envs_per_worker
+        replies = self._command([STEP + self.actions[start:start + step].tobytes()
+                                 for start in range(0, self.num_envs, step)])
+        observations, action_masks = self._results()
+        rewards = self.arrays["rewards"].copy()
+        terminated = self.arrays["terminated"].copy()
+        truncated = np.zeros(self.num_envs, dtype=bool)
+        infos = {}
+        for reply in replies:
+            if reply:
+                for env_index, observation, deal_id in pickle.loads(reply):
+                    infos = self._add_info(infos, {"final_obs": observation, "final_info": {"deal_id": deal_id}},
+                                           env_index)
+        infos["action_mask"] = action_masks
+        return observations, rewards, terminated, truncated, infos
+
+    def close_extras(self, **kwargs):
+        for connection in self.connections:
+            try:
+                connection.send_bytes(CLOSE)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+        for connection in self.connections:
+            connection.close()
+        self.arrays.clear()
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks.clear()